@@ -0,0 +1,162 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Cascading lookups for address forms and API clients.
+
+region -> subregion -> country -> state -> city. Responses are cached in Redis
+per import generation and carry an ETag, so clients can revalidate with
+If-None-Match and get an empty 304 while the data is unchanged.
+
+nearest_city and resolve_points map GPS coordinates to City records through an
+in-memory spatial index; cities_within and cities_in_bbox query the indexed
+geohash column. resolve_locations matches free-text addresses in batches, and get_rollup groups any
+record linked to a location by a level of the hierarchy.
+"""
+
+import frappe
+from frappe.utils import cint, flt
+
+from erpnext_location.erpnext_location.utils import geo, resolve, rollup
+from erpnext_location.erpnext_location.utils.cache import cached_response
+
+MAX_PAGE_LENGTH = 500
+MAX_NEIGHBOURS = 100
+MAX_POINTS = 10000
+MAX_RESULTS = 5000
+MAX_ROWS = 10000
+
+
+@frappe.whitelist()
+def get_regions():
+    """All regions"""
+    frappe.has_permission("Region", throw=True)
+    return cached_response(
+        "regions", {},
+        lambda: frappe.get_all("Region", fields=["name", "region_name"], order_by="region_name asc"),
+    )
+
+
+@frappe.whitelist()
+def get_subregions(region):
+    """Subregions of a region"""
+    frappe.has_permission("Subregion", throw=True)
+    return cached_response(
+        "subregions", {"region": region},
+        lambda: frappe.get_all(
+            "Subregion", filters={"region": region}, fields=["name", "subregion_name"], order_by="subregion_name asc"
+        ),
+    )
+
+
+@frappe.whitelist()
+def get_countries(region=None, subregion=None):
+    """Countries, optionally limited to a region or subregion"""
+    frappe.has_permission("Country", throw=True)
+    filters = {}
+    if region:
+        filters["region"] = region
+    if subregion:
+        filters["subregion"] = subregion
+
+    return cached_response(
+        "countries", filters,
+        lambda: frappe.get_all("Country", filters=filters, fields=["name", "code"], order_by="name asc"),
+    )
+
+
+@frappe.whitelist()
+def get_states(country):
+    """Active states of a country"""
+    frappe.has_permission("State", throw=True)
+    return cached_response(
+        "states", {"country": country},
+        lambda: frappe.get_all(
+            "State",
+            filters={"country": country, "is_active": 1},
+            fields=["name", "state_name", "state_code"],
+            order_by="state_name asc",
+        ),
+    )
+
+
+@frappe.whitelist()
+def get_cities(state, prefix=None, page=0, page_length=50):
+    """One page of the active cities of a state, optionally filtered by name prefix"""
+    frappe.has_permission("City", throw=True)
+    page = max(cint(page), 0)
+    page_length = min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+    prefix = (prefix or "").strip()
+
+    def generator():
+        filters = {"state": state, "is_active": 1}
+        if prefix:
+            filters["city_name"] = ["like", f"{prefix}%"]
+        # One extra row tells whether there is a next page
+        cities = frappe.get_all(
+            "City",
+            filters=filters,
+            fields=["name", "city_name"],
+            order_by="city_name asc",
+            limit_start=page * page_length,
+            limit_page_length=page_length + 1,
+        )
+        return {"cities": cities[:page_length], "page": page, "has_more": len(cities) > page_length}
+
+    return cached_response(
+        "cities", {"state": state, "prefix": prefix, "page": page, "page_length": page_length}, generator
+    )
+
+
+@frappe.whitelist()
+def nearest_city(lat, lon, k=1, max_distance_km=None):
+    """The k active cities closest to a latitude/longitude, closest first"""
+    frappe.has_permission("City", throw=True)
+    k = min(max(cint(k), 1), MAX_NEIGHBOURS)
+    return geo.nearest_cities(lat, lon, k, flt(max_distance_km) if max_distance_km else None)
+
+
+@frappe.whitelist(methods=["POST"])
+def resolve_points(points, max_distance_km=None):
+    """Nearest active city of each [lat, lon] in `points`, or None when none is within max_distance_km"""
+    frappe.has_permission("City", throw=True)
+    points = frappe.parse_json(points)
+    if len(points) > MAX_POINTS:
+        frappe.throw(f"At most {MAX_POINTS} points can be resolved per call")
+
+    max_distance_km = flt(max_distance_km) if max_distance_km else None
+    results = []
+    for lat, lon in points:
+        nearest = geo.nearest_cities(lat, lon, 1, max_distance_km)
+        results.append(nearest[0] if nearest else None)
+    return results
+
+
+@frappe.whitelist()
+def cities_within(lat, lon, radius_km, limit=MAX_RESULTS):
+    """Active cities within radius_km of a latitude/longitude, closest first"""
+    frappe.has_permission("City", throw=True)
+    return geo.cities_within(lat, lon, radius_km, min(max(cint(limit), 1), MAX_RESULTS))
+
+
+@frappe.whitelist()
+def cities_in_bbox(south, west, north, east, limit=MAX_RESULTS):
+    """Active cities inside a bounding box; west > east crosses the antimeridian"""
+    frappe.has_permission("City", throw=True)
+    return geo.cities_in_bbox(south, west, north, east, min(max(cint(limit), 1), MAX_RESULTS))
+
+
+@frappe.whitelist(methods=["POST"])
+def resolve_locations(rows):
+    """City, State and Country links with a confidence for each free-text (city, state, country) row"""
+    frappe.has_permission("City", throw=True)
+    triples = resolve.parse_rows(rows)
+    if len(triples) > MAX_ROWS:
+        frappe.throw(f"At most {MAX_ROWS} rows can be resolved per call")
+    return resolve.resolve_rows(triples)
+
+
+@frappe.whitelist()
+def get_rollup(doctype, location_field, level, value_field=None, filters=None):
+    """Records of `doctype` counted, and value_field summed, per region, subregion, country, state or city"""
+    frappe.has_permission(doctype, "report", throw=True)
+    return rollup.get_rollup(doctype, location_field, level, value_field, frappe.parse_json(filters))
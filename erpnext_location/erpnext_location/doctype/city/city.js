@@ -1,8 +1,26 @@
 // Copyright (c) 2025, Novizna and contributors
 // For license information, please see license.txt
 
-// frappe.ui.form.on("City", {
-// 	refresh(frm) {
+frappe.ui.form.on("City", {
+	setup(frm) {
+		frm.set_query("state", () => ({ filters: { country: frm.doc.country } }));
+	},
 
-// 	},
-// });
+	country(frm) {
+		// Keep the state only if it belongs to the new country; the check runs on the cached bundle
+		if (!frm.doc.state) {
+			return;
+		}
+		erpnext_location.locations.get_state(frm.doc.country, frm.doc.state).then((state) => {
+			if (!state) {
+				frm.set_value("state", null);
+			}
+		});
+	},
+
+	state(frm) {
+		erpnext_location.locations.get_state(frm.doc.country, frm.doc.state).then((state) => {
+			frm.set_value("state_code", state ? state.state_code : null);
+		});
+	},
+});
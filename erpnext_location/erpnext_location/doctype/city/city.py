@@ -4,29 +4,79 @@
 import frappe
 from frappe.model.document import Document
 
+from erpnext_location.erpnext_location.utils.bundles import enqueue_country_bundle
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+from erpnext_location.erpnext_location.utils.counters import update_counters
+from erpnext_location.erpnext_location.utils.geo import get_geohash, invalidate_city_index
+from erpnext_location.erpnext_location.utils.indexes import add_indexes
+from erpnext_location.erpnext_location.utils.lookup import get_state_parent
+from erpnext_location.erpnext_location.utils.search import delete_search_index, update_search_index
+
 
 class City(Document):
     def before_insert(self):
         """Set country and state codes before insert"""
+        if self.flags.in_location_import:
+            return
+
         if self.state and not self.state_code:
-            state_doc = frappe.get_doc("State", self.state)
-            self.state_code = state_doc.state_code
-            self.country = state_doc.country
-            self.country_code = state_doc.country_code
+            state = self.get_state_parent()
+            self.state_code = state.state_code
+            self.country = state.country
+            self.country_code = state.country_code
+            self.region = state.region
+            self.subregion = state.subregion
 
     def before_save(self):
-        """Update last_updated timestamp"""
+        """Update last_updated timestamp and geohash"""
         self.last_updated = frappe.utils.now()
+        self.geohash = get_geohash(self.latitude, self.longitude)
 
     def validate(self):
         """Validate city data"""
+        # Imports check links for the whole table after each stage instead
+        if self.flags.in_location_import:
+            return
+
         # Ensure state and country are linked correctly
         if self.state:
-            state_doc = frappe.get_doc("State", self.state)
-            if self.country and self.country != state_doc.country:
-                frappe.throw(f"Country mismatch. State {self.state} belongs to {state_doc.country}, not {self.country}")
-
-            # Auto-set country from state
-            self.country = state_doc.country
-            self.country_code = state_doc.country_code
-            self.state_code = state_doc.state_code
+            state = self.get_state_parent()
+            if self.country and self.country != state.country:
+                frappe.throw(f"Country mismatch. State {self.state} belongs to {state.country}, not {self.country}")
+
+            # Auto-set country, region and subregion from state
+            self.country = state.country
+            self.country_code = state.country_code
+            self.state_code = state.state_code
+            self.region = state.region
+            self.subregion = state.subregion
+
+    def on_update(self):
+        update_search_index(self)
+        update_counters(self, "on_update")
+        enqueue_country_bundle(self)
+        bump_generation(self)
+        invalidate_city_index(self)
+
+    def on_trash(self):
+        delete_search_index(self.doctype, self.name)
+        update_counters(self, "on_trash")
+        enqueue_country_bundle(self)
+        bump_generation(self)
+        invalidate_city_index(self)
+
+    def after_rename(self, old, new, merge=False):
+        update_search_index(self, [old, new])
+        bump_generation(self)
+        invalidate_city_index(self)
+
+    def get_state_parent(self):
+        """Country and codes of the linked State, from the lookup cache"""
+        state = get_state_parent(self.state)
+        if not state:
+            frappe.throw(f"State {self.state} not found", frappe.DoesNotExistError)
+        return state
+
+
+def on_doctype_update():
+    add_indexes("City")
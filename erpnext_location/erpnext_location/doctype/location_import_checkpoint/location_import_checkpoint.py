@@ -0,0 +1,60 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.model.document import Document
+
+
+class LocationImportCheckpoint(Document):
+	pass
+
+
+@frappe.whitelist()
+def resume_import(run_id):
+	"""Re-enqueue an interrupted import so it continues from its checkpoint"""
+	frappe.only_for("System Manager")
+
+	checkpoint = frappe.get_doc("Location Import Checkpoint", run_id)
+	if checkpoint.status in ("Completed", "Abandoned"):
+		frappe.throw(f"Location import {run_id} is {checkpoint.status.lower()} and cannot be resumed")
+
+	options = json.loads(checkpoint.options or "{}")
+	if options.get("shard_of"):
+		from erpnext_location.erpnext_location.utils.import_coordinator import enqueue_shard
+
+		enqueue_shard(options["shard_of"], options["shard_no"])
+	elif options.get("shards"):
+		frappe.enqueue(
+			method="erpnext_location.erpnext_location.utils.import_coordinator.run_sharded_import",
+			queue="long",
+			timeout=3600,
+			job_name=f"location_data_import:{run_id}",
+			run_id=run_id,
+			**options,
+		)
+	else:
+		frappe.enqueue(
+			method="erpnext_location.erpnext_location.utils.data_import.refresh_location_data_chunked",
+			queue="long",
+			timeout=3600,
+			job_name=f"location_data_import:{run_id}",
+			run_id=run_id,
+			**options,
+		)
+
+	return run_id
+
+
+@frappe.whitelist()
+def abandon_import(run_id):
+	"""Mark an interrupted import as abandoned so it is never resumed"""
+	frappe.only_for("System Manager")
+
+	checkpoint = frappe.get_doc("Location Import Checkpoint", run_id)
+	if checkpoint.status == "Completed":
+		frappe.throw(f"Location import {run_id} is already completed")
+
+	checkpoint.db_set("status", "Abandoned")
+	return run_id
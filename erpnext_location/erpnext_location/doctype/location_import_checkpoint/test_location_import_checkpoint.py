@@ -0,0 +1,71 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# See license.txt
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_location.erpnext_location.utils import data_import
+from erpnext_location.erpnext_location.utils.data_import import LocationDataImporter
+
+
+def get_importer(stage, batch_offset, source_checksum="abc"):
+	"""An importer attached to a checkpoint of `stage`, reading files whose checksum is abc"""
+	importer = LocationDataImporter()
+	importer.source = MagicMock()
+	importer.source.checksum.return_value = "abc"
+	importer.checkpoint = frappe._dict(
+		run_id="test-run",
+		stage=stage,
+		batch_offset=batch_offset,
+		last_external_id="3" if batch_offset else None,
+		source_checksum=source_checksum,
+		db_set=MagicMock(),
+	)
+	return importer
+
+
+class TestLocationImportCheckpoint(FrappeTestCase):
+	def begin_stage(self, importer, stage):
+		with patch.object(frappe.db, "commit"):
+			return importer.begin_stage(stage)
+
+	def test_completed_stages_are_skipped(self):
+		importer = get_importer("states", 200)
+		self.assertIsNone(self.begin_stage(importer, "countries"))
+		importer.checkpoint.db_set.assert_not_called()
+
+	def test_stage_resumes_after_committed_batches(self):
+		importer = get_importer("states", 200)
+		self.assertEqual(self.begin_stage(importer, "states"), 200)
+		self.assertEqual(importer.checkpoint.db_set.call_args.args[0]["batch_offset"], 200)
+
+	def test_changed_file_restarts_the_stage(self):
+		importer = get_importer("states", 200, source_checksum="old")
+		self.assertEqual(self.begin_stage(importer, "states"), 0)
+		self.assertEqual(importer.checkpoint.db_set.call_args.args[0]["source_checksum"], "abc")
+
+	def test_next_stage_starts_from_the_beginning(self):
+		importer = get_importer("states", 200)
+		self.assertEqual(self.begin_stage(importer, "cities"), 0)
+		self.assertEqual(importer.checkpoint.db_set.call_args.args[0]["stage"], "cities")
+
+	def test_import_rows_only_writes_uncommitted_batches(self):
+		importer = get_importer("regions", 2)
+		importer.batch_size = 2
+		rows = [{"name": f"Region {i}", "external_id": str(i)} for i in range(1, 6)]
+
+		with (
+			patch.object(importer, "write_rows", side_effect=lambda doctype, batch, *args: len(batch)) as write_rows,
+			patch.object(importer, "reconcile_removed") as reconcile_removed,
+			patch.object(data_import, "bump_generation"),
+			patch.object(frappe.db, "commit"),
+		):
+			imported = importer.import_rows("Region", rows, resume_from=2)
+
+		self.assertEqual(imported, 3)
+		self.assertEqual([[row["name"] for row in call.args[1]] for call in write_rows.call_args_list], [["Region 3", "Region 4"], ["Region 5"]])
+		self.assertEqual([call.args[0]["batch_offset"] for call in importer.checkpoint.db_set.call_args_list], [4, 5])
+		# Rows committed by the earlier attempt still count as upstream
+		self.assertEqual(reconcile_removed.call_args.args[1], {"1", "2", "3", "4", "5"})
@@ -0,0 +1,8 @@
+// Copyright (c) 2025, Novizna and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Location Import Log", {
+// 	refresh(frm) {
+
+// 	},
+// });
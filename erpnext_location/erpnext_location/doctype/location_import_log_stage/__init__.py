@@ -0,0 +1,2 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
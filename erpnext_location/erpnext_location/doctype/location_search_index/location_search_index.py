@@ -0,0 +1,15 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from erpnext_location.erpnext_location.utils.indexes import add_indexes
+
+
+class LocationSearchIndex(Document):
+	pass
+
+
+def on_doctype_update():
+	add_indexes("Location Search Index")
@@ -0,0 +1,9 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# See license.txt
+
+# import frappe
+from frappe.tests.utils import FrappeTestCase
+
+
+class TestLocationSearchIndex(FrappeTestCase):
+	pass
@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now
 
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+
 
 class Region(Document):
 	def before_save(self):
@@ -26,6 +28,12 @@ class Region(Document):
 		"""Actions after inserting a new region"""
 		frappe.logger().info(f"New region created: {self.region_name}")
 
+	def on_update(self):
+		bump_generation(self)
+
+	def on_trash(self):
+		bump_generation(self)
+
 	@frappe.whitelist()
 	def get_subregions(self):
 		"""Get all subregions belonging to this region"""
@@ -38,6 +46,6 @@ class Region(Document):
 	def get_countries(self):
 		"""Get all countries in this region"""
 		return frappe.get_all("Country",
-			filters={"region": self.region_name},
+			filters={"region": self.name},
 			fields=["name", "code", "iso3", "capital"]
 		)
@@ -4,23 +4,77 @@
 import frappe
 from frappe.model.document import Document
 
+from erpnext_location.erpnext_location.utils.bundles import enqueue_country_bundle
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+from erpnext_location.erpnext_location.utils.consistency import CITY_COLUMNS, reconcile_cities
+from erpnext_location.erpnext_location.utils.counters import recompute_counters, update_counters
+from erpnext_location.erpnext_location.utils.geo import get_geohash, invalidate_city_index
+from erpnext_location.erpnext_location.utils.indexes import add_indexes
+from erpnext_location.erpnext_location.utils.lookup import clear_state_parent, get_country_code
+from erpnext_location.erpnext_location.utils.search import delete_search_index, update_search_index
+
 
 class State(Document):
     def before_insert(self):
         """Set country code from country before insert"""
+        if self.flags.in_location_import:
+            return
+
         if self.country and not self.country_code:
-            country_doc = frappe.get_doc("Country", self.country)
-            self.country_code = country_doc.code
+            self.country_code = get_country_code(self.country)
 
     def before_save(self):
-        """Update last_updated timestamp"""
+        """Update last_updated timestamp and geohash"""
         self.last_updated = frappe.utils.now()
+        self.geohash = get_geohash(self.latitude, self.longitude)
 
     def validate(self):
         """Validate state data"""
+        # Imports check links for the whole table after each stage instead
+        if self.flags.in_location_import:
+            return
+
         # Ensure country code matches the linked country
         if self.country:
-            country_doc = frappe.get_doc("Country", self.country)
-            if self.country_code and self.country_code != country_doc.code:
-                frappe.throw(f"Country code mismatch. Expected {country_doc.code}, got {self.country_code}")
-            self.country_code = country_doc.code
+            country_code = get_country_code(self.country)
+            if self.country_code and self.country_code != country_code:
+                frappe.throw(f"Country code mismatch. Expected {country_code}, got {self.country_code}")
+            self.country_code = country_code
+            self.region, self.subregion = (
+                frappe.get_cached_value("Country", self.country, ["region", "subregion"]) or (None, None)
+            )
+
+    def on_update(self):
+        update_search_index(self)
+        update_counters(self, "on_update")
+        enqueue_country_bundle(self)
+        clear_state_parent(self.name)
+        bump_generation(self)
+        if self.flags.in_location_import or self.flags.in_insert:
+            return
+        if any(self.has_value_changed(field) for field in CITY_COLUMNS):
+            # Cities copy these columns; realign the ones in this state's country in one pass
+            reconcile_cities([self.country_code])
+            if self.has_value_changed("country"):
+                invalidate_city_index(self)
+            if any(self.has_value_changed(field) for field in ("country", "region", "subregion")):
+                # The moved cities count towards other ancestors now
+                recompute_counters(["active_cities"])
+
+    def on_trash(self):
+        delete_search_index(self.doctype, self.name)
+        update_counters(self, "on_trash")
+        enqueue_country_bundle(self)
+        clear_state_parent(self.name)
+        bump_generation(self)
+
+    def after_rename(self, old, new, merge=False):
+        update_search_index(self, [old, new])
+        clear_state_parent(old, new)
+        bump_generation(self)
+        # Renaming relinks the cities of this state, which the nearest-city index holds
+        invalidate_city_index(self)
+
+
+def on_doctype_update():
+    add_indexes("State")
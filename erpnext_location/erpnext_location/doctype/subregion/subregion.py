@@ -5,6 +5,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import now
 
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+
 
 class Subregion(Document):
     def before_save(self):
@@ -32,10 +34,16 @@ class Subregion(Document):
         """Actions after inserting a new subregion"""
         frappe.logger().info(f"New subregion created: {self.subregion_name}")
 
+    def on_update(self):
+        bump_generation(self)
+
+    def on_trash(self):
+        bump_generation(self)
+
     @frappe.whitelist()
     def get_countries(self):
         """Get all countries in this subregion"""
         return frappe.get_all("Country",
-            filters={"subregion": self.subregion_name},
+            filters={"subregion": self.name},
             fields=["name", "code", "iso3", "capital", "region"]
         )
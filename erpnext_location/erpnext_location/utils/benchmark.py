@@ -0,0 +1,334 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Import benchmark for LocationDataImporter.
+
+Generates a synthetic region/subregion/country/state/city dataset, serves it from
+a local HTTP server (or reads it straight from disk) and times each import stage,
+reporting rows/sec, database query count and peak RSS. Run it on a scratch site:
+
+    bench --site bench.local execute erpnext_location.erpnext_location.utils.benchmark.run_benchmark --kwargs "{'scale': '10k'}"
+
+All synthetic records are named "Benchmark ...", use ISO user-assigned country
+codes and external ids above ID_OFFSET, so they never match real rows. The state
+and city stages are scoped to the synthetic countries, and everything the run
+wrote is deleted again unless `keep=True`.
+"""
+
+import csv
+import gzip
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from itertools import chain
+
+import frappe
+
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+from erpnext_location.erpnext_location.utils.data_import import STAGES, LocationDataImporter
+from erpnext_location.erpnext_location.utils.formats import FORMATS
+from erpnext_location.erpnext_location.utils.geo import invalidate_city_index
+from erpnext_location.erpnext_location.utils.lookup import clear_lookup_cache
+from erpnext_location.erpnext_location.utils.search import SEARCH_DOCTYPE
+from erpnext_location.erpnext_location.utils.sources import LocalSource, RemoteSource
+
+SCALES = {"1k": 1_000, "10k": 10_000, "150k": 150_000, "1m": 1_000_000}
+PREFIX = "Benchmark"
+# ISO 3166 user-assigned alpha-2 codes, without XK, which the upstream dataset uses for Kosovo
+COUNTRY_CODES = ["aa", "zz"] + [f"q{letter}" for letter in "mnopqrstuvwxyz"] + [f"x{letter}" for letter in "abcdefghijlmnopqrstuvwxyz"]
+# Synthetic external ids start here, far above the upstream ids every site already has
+ID_OFFSET = 10**9
+
+
+def get_dataset_sizes(cities):
+    countries = min(len(COUNTRY_CODES), max(2, cities // 2_000))
+    return {
+        "regions": 3,
+        "subregions": 6,
+        "countries": countries,
+        "states": max(countries, cities // 30),
+        "cities": cities,
+    }
+
+
+def generate_records(cities, seed=0):
+    """Return {dataset: generator of records} for a synthetic dataset of `cities` cities"""
+    sizes = get_dataset_sizes(cities)
+    rng = random.Random(seed)
+
+    def coordinate(limit):
+        return f"{rng.uniform(-limit, limit):.8f}"
+
+    def regions():
+        for i in range(1, sizes["regions"] + 1):
+            yield {"id": ID_OFFSET + i, "name": f"{PREFIX} Region {i}", "wikiDataId": f"QR{i}"}
+
+    def subregions():
+        for i in range(1, sizes["subregions"] + 1):
+            yield {
+                "id": ID_OFFSET + i,
+                "name": f"{PREFIX} Subregion {i}",
+                "region_id": ID_OFFSET + (i - 1) % sizes["regions"] + 1,
+                "wikiDataId": f"QS{i}",
+            }
+
+    def countries():
+        for i in range(1, sizes["countries"] + 1):
+            code = COUNTRY_CODES[i - 1]
+            subregion = (i - 1) % sizes["subregions"] + 1
+            yield {
+                "id": ID_OFFSET + i,
+                "name": f"{PREFIX} Country {i}",
+                "iso2": code.upper(),
+                "iso3": f"{code.upper()}X",
+                "numeric_code": f"{900 + i}",
+                "phonecode": f"{900 + i}",
+                "capital": f"{PREFIX} Capital {i}",
+                "currency_name": "Benchmark Dollar",
+                "currency_symbol": "$",
+                "tld": f".{code}",
+                "native": f"{PREFIX} Country {i}",
+                "region": f"{PREFIX} Region {(subregion - 1) % sizes['regions'] + 1}",
+                "subregion": f"{PREFIX} Subregion {subregion}",
+                "nationality": "Benchmarker",
+                "latitude": coordinate(90),
+                "longitude": coordinate(180),
+                "emoji": "",
+                "emojiU": "",
+            }
+
+    def states():
+        for i in range(1, sizes["states"] + 1):
+            yield {
+                "id": ID_OFFSET + i,
+                "name": f"{PREFIX} State {i}",
+                "country_code": COUNTRY_CODES[(i - 1) % sizes["countries"]].upper(),
+                "iso2": str(i),
+                "type": "state",
+                "fips_code": None,
+                "latitude": coordinate(90),
+                "longitude": coordinate(180),
+            }
+
+    def cities_():
+        for i in range(1, sizes["cities"] + 1):
+            state = (i - 1) % sizes["states"] + 1
+            yield {
+                "id": ID_OFFSET + i,
+                "name": f"{PREFIX} City {i}",
+                "state_id": ID_OFFSET + state,
+                "state_name": f"{PREFIX} State {state}",
+                "country_code": COUNTRY_CODES[(state - 1) % sizes["countries"]].upper(),
+                "latitude": coordinate(90),
+                "longitude": coordinate(180),
+                "wikiDataId": f"QC{i}",
+            }
+
+    return {
+        "regions": regions(),
+        "subregions": subregions(),
+        "countries": countries(),
+        "states": states(),
+        "cities": cities_(),
+    }
+
+
+def write_dataset(path, cities, data_format="json", seed=0):
+    """Write a synthetic dataset in one of the importer's formats and return the record counts"""
+    os.makedirs(path, exist_ok=True)
+    adapter = FORMATS[data_format]()
+    counts = {}
+
+    if data_format == "sqlite":
+        connection = sqlite3.connect(os.path.join(path, adapter.filename))
+        for dataset, records in generate_records(cities, seed).items():
+            counts[dataset] = write_sqlite_table(connection, dataset, records)
+        connection.commit()
+        connection.close()
+        return counts
+
+    for dataset, records in generate_records(cities, seed).items():
+        filename = os.path.join(path, adapter.get_filename(dataset))
+        if data_format == "csv":
+            counts[dataset] = write_csv(filename, records)
+        else:
+            opener = gzip.open if data_format == "json.gz" else open
+            with opener(filename, "wt", encoding="utf-8") as f:
+                counts[dataset] = write_json_array(f, records)
+
+    return counts
+
+
+def write_json_array(f, records):
+    count = 0
+    f.write("[")
+    for count, record in enumerate(records, 1):
+        if count > 1:
+            f.write(",\n")
+        f.write(json.dumps(record, ensure_ascii=False))
+    f.write("]")
+    return count
+
+
+def write_csv(filename, records):
+    count = 0
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        for record in records:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(record))
+                writer.writeheader()
+            writer.writerow(record)
+            count += 1
+    return count
+
+
+def write_sqlite_table(connection, dataset, records):
+    first = next(records)
+    # Like the upstream export, the cities table has no state name
+    columns = [column for column in first if not (dataset == "cities" and column == "state_name")]
+    connection.execute(f"create table {dataset} ({', '.join(columns)})")
+    insert = f"insert into {dataset} values ({', '.join('?' * len(columns))})"
+
+    count = 0
+    for record in chain([first], records):
+        connection.execute(insert, [record[column] for column in columns])
+        count += 1
+    return count
+
+
+@contextmanager
+def serve_directory(path):
+    """Serve `path` over HTTP on a free local port and yield the base URL"""
+    handler = partial(QuietHandler, directory=path)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def run_benchmark(
+    scale="1k",
+    data_format="json",
+    transport="http",
+    bulk=True,
+    streaming=True,
+    incremental=False,
+    force_update=False,
+    keep=False,
+):
+    """Import a synthetic dataset and report per-stage timings.
+
+    `scale` is one of 1k, 10k, 150k, 1m or a number of cities; `transport` is
+    "http" (local HTTP server through the download cache) or "file".
+    """
+    cities = SCALES.get(str(scale).lower()) or int(scale)
+    workdir = tempfile.mkdtemp(prefix="location-benchmark-")
+    counts = None
+
+    try:
+        data_dir = os.path.join(workdir, "data")
+        started = time.monotonic()
+        counts = write_dataset(data_dir, cities, data_format)
+        print(f"Generated {counts} as {data_format} in {time.monotonic() - started:.1f}s")
+
+        if transport == "http":
+            with serve_directory(data_dir) as url:
+                source = RemoteSource(url, cache_dir=os.path.join(workdir, "cache"))
+                report = benchmark_import(source, counts, data_format, bulk, streaming, incremental, force_update)
+        else:
+            report = benchmark_import(LocalSource(data_dir), counts, data_format, bulk, streaming, incremental, force_update)
+
+        print_report(report)
+        return report
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if not keep:
+            delete_benchmark_records(counts.get("countries") if counts else None)
+
+
+def benchmark_import(source, counts, data_format, bulk, streaming, incremental, force_update):
+    importer = LocationDataImporter(
+        bulk=bulk, streaming=streaming, source=source, incremental=incremental, data_format=data_format
+    )
+    # Reconciliation and the search index only touch the synthetic countries
+    importer.country_codes = set(COUNTRY_CODES[:counts["countries"]])
+    stage_methods = {
+        "regions": importer.import_regions,
+        "subregions": importer.import_subregions,
+        "countries": importer.import_countries,
+        "states": importer.import_states,
+        "cities": importer.import_cities,
+    }
+
+    report = {"scale": counts["cities"], "format": data_format, "bulk": bulk, "streaming": streaming, "stages": []}
+    for stage in STAGES:
+        imported = stage_methods[stage](force_update)
+        # Timings, query counts and peak RSS come from the importer's own stage metrics
+        metrics = importer.stage_metrics[stage]
+
+        report["stages"].append({
+            "stage": stage,
+            "rows_read": metrics.rows_read,
+            "imported": imported,
+            "seconds": round(metrics.duration, 3),
+            "rows_per_sec": round(metrics.rows_read / metrics.duration, 1) if metrics.duration else None,
+            "queries": metrics.queries,
+            "peak_rss_mb": metrics.peak_memory_mb,
+        })
+
+    report["stats"] = importer.stats
+    report["total_seconds"] = round(sum(stage["seconds"] for stage in report["stages"]), 3)
+    return report
+
+
+def print_report(report):
+    print(f"\nLocation import benchmark: {report['scale']} cities, {report['format']}, bulk={report['bulk']}, streaming={report['streaming']}")
+    print(f"{'stage':<12}{'rows':>10}{'imported':>10}{'seconds':>10}{'rows/sec':>12}{'queries':>10}{'peak MB':>10}")
+    for stage in report["stages"]:
+        print(
+            f"{stage['stage']:<12}{stage['rows_read']:>10}{stage['imported']:>10}{stage['seconds']:>10}"
+            f"{stage['rows_per_sec'] or 0:>12}{stage['queries']:>10}{stage['peak_rss_mb']:>10}"
+        )
+    print(f"total: {report['total_seconds']}s")
+
+
+def delete_benchmark_records(countries=None):
+    """Remove every record a benchmark run wrote and drop the caches that may still hold them"""
+    codes = COUNTRY_CODES[:countries] if countries else COUNTRY_CODES
+    country_names = frappe.get_all(
+        "Country", filters={"code": ["in", codes], "name": ["like", f"{PREFIX} %"]}, pluck="name"
+    )
+
+    if country_names:
+        frappe.db.delete(SEARCH_DOCTYPE, {"country": ["in", country_names]})
+    for doctype in ("City", "State"):
+        frappe.db.delete(doctype, {"country_code": ["in", codes], "name": ["like", f"{PREFIX} %"]})
+    for country in country_names:
+        frappe.db.delete("Country", {"name": country})
+        frappe.clear_document_cache("Country", country)
+    for doctype in ("Subregion", "Region"):
+        frappe.db.delete(doctype, {"name": ["like", f"{PREFIX} %"]})
+    frappe.db.commit()
+
+    clear_lookup_cache()
+    bump_generation()
+    invalidate_city_index()
@@ -0,0 +1,151 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Static per-country bundles of states and cities for client-side dropdowns.
+
+Each active country gets a gzipped JSON file in the site's public files, named
+after its code and a hash of its content, so browsers can cache it forever.
+manifest.json maps every country to its current file and is the only file
+clients need to revalidate. A bundle holds
+
+    {"country": name, "code": code,
+     "states": [[name, state_name, state_code], ...],
+     "cities": [[name, city_name, index of the state in "states"], ...]}
+
+Unchanged countries keep their file; files no longer in the manifest are removed.
+Builds of different countries run as concurrent jobs, so each holds a file lock
+while it writes its files, rewrites the manifest and removes unreferenced files.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+
+import frappe
+from frappe.utils.synchronization import filelock
+
+from erpnext_location.erpnext_location.utils.cache import get_generation
+
+BUNDLE_DIR = "location_bundles"
+MANIFEST = "manifest.json"
+# A full build writes every country's file under the lock, so waiters get time for it
+LOCK_TIMEOUT = 300
+
+
+def get_bundle_path(*parts):
+    return frappe.get_site_path("public", "files", BUNDLE_DIR, *parts)
+
+
+def get_bundle_url(filename):
+    return f"/files/{BUNDLE_DIR}/{filename}"
+
+
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode()
+
+
+def read_manifest():
+    try:
+        with open(get_bundle_path(MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"countries": {}}
+
+
+def write_atomic(path, content):
+    """Write to a temporary file first so clients never read half a file"""
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(content)
+    os.replace(f"{path}.tmp", path)
+
+
+def collect_bundles(countries=None):
+    """{country: bundle} of active states and cities, from one query per doctype"""
+    filters = {"is_active": 1}
+    if countries:
+        filters["country"] = ["in", countries]
+
+    bundles, state_index = {}, {}
+    country_codes = dict(frappe.get_all("Country", fields=["name", "code"], as_list=True))
+    for state in frappe.get_all(
+        "State", filters=filters, fields=["name", "state_name", "state_code", "country"], order_by="state_name asc"
+    ):
+        bundle = bundles.setdefault(
+            state.country,
+            {"country": state.country, "code": country_codes.get(state.country), "states": [], "cities": []},
+        )
+        state_index[state.name] = len(bundle["states"])
+        bundle["states"].append([state.name, state.state_name, state.state_code])
+
+    for city in frappe.get_all(
+        "City", filters=filters, fields=["name", "city_name", "state", "country"], order_by="city_name asc"
+    ):
+        if city.state in state_index and city.country in bundles:
+            bundles[city.country]["cities"].append([city.name, city.city_name, state_index[city.state]])
+
+    return bundles
+
+
+def build_bundles(countries=None):
+    """Write the bundles of all countries, or of `countries`, and update the manifest"""
+    # Rows are read under the lock too, so a build that started earlier never overwrites newer data
+    with filelock("location_bundles", timeout=LOCK_TIMEOUT):
+        return write_bundles(collect_bundles(countries), countries)
+
+
+def write_bundles(bundles, countries=None):
+    os.makedirs(get_bundle_path(), exist_ok=True)
+    manifest = read_manifest() if countries else {"countries": {}}
+    written = 0
+
+    if countries:
+        # Countries left without active states drop out of the manifest
+        for country in countries:
+            manifest["countries"].pop(country, None)
+
+    for country, bundle in bundles.items():
+        content = dumps(bundle)
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        filename = f"{(bundle['code'] or frappe.scrub(country)).lower()}.{digest}.json.gz"
+        if not os.path.exists(get_bundle_path(filename)):
+            # mtime=0 keeps the compressed bytes stable for the same content
+            write_atomic(get_bundle_path(filename), gzip.compress(content, compresslevel=9, mtime=0))
+            written += 1
+        manifest["countries"][country] = {
+            "code": bundle["code"],
+            "url": get_bundle_url(filename),
+            "states": len(bundle["states"]),
+            "cities": len(bundle["cities"]),
+        }
+
+    manifest["generation"] = get_generation()
+    write_atomic(get_bundle_path(MANIFEST), dumps(manifest))
+    remove_unreferenced(manifest)
+
+    frappe.logger().info(f"Location bundles: {written} written, {len(manifest['countries'])} in manifest")
+    return manifest
+
+
+def remove_unreferenced(manifest):
+    referenced = {os.path.basename(entry["url"]) for entry in manifest["countries"].values()}
+    for filename in os.listdir(get_bundle_path()):
+        if filename.endswith(".json.gz") and filename not in referenced:
+            os.remove(get_bundle_path(filename))
+
+
+def enqueue_country_bundle(doc, method=None):
+    """Rebuild the bundles of an edited City's or State's old and new country once the transaction commits"""
+    if doc.flags.in_location_import:
+        return
+
+    before = doc.get_doc_before_save()
+    for country in {doc.get("country"), before.get("country") if before else None} - {None, ""}:
+        frappe.enqueue(
+            "erpnext_location.erpnext_location.utils.bundles.build_bundles",
+            queue="short",
+            job_id=f"location_bundle:{country}",
+            deduplicate=True,
+            enqueue_after_commit=True,
+            countries=[country],
+        )
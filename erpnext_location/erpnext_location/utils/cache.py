@@ -0,0 +1,91 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Import generation counter and generation-versioned API responses.
+
+Every change to location data, whether an import stage or a saved or deleted
+record, bumps the generation once it is committed. Cached API responses and
+their ETags include the generation, so a bump invalidates all of them at once
+without scanning Redis.
+"""
+
+import hashlib
+import json
+import time
+from functools import partial
+
+import frappe
+from werkzeug.wrappers import Response
+
+# Renamed from location_data_generation when the value stopped being pickled
+GENERATION_KEY = "location_generation"
+API_CACHE_TTL = 24 * 60 * 60
+
+
+def get_generation(key=GENERATION_KEY):
+    """Current generation of the location data, or of another counter kept the same way"""
+    # Stored as a plain Redis integer, unpickled, so it can be incremented atomically
+    key = frappe.cache.make_key(key)
+    generation = frappe.cache.get(key)
+    if generation is None:
+        # Start from the clock so ETags issued before a Redis flush are never reused
+        frappe.cache.set(key, int(time.time()), nx=True)
+        generation = frappe.cache.get(key)
+    return int(generation)
+
+
+def increment_generation(key=GENERATION_KEY):
+    get_generation(key)
+    frappe.cache.incr(frappe.cache.make_key(key))
+
+
+def bump_generation(doc=None, method=None, key=GENERATION_KEY):
+    """Invalidate cached location responses; also usable as a doc_events handler.
+
+    Called for a document, the bump waits for the transaction to commit, so a
+    response computed meanwhile from the old rows is cached under the old
+    generation. Import stages call it after committing and bump at once.
+    """
+    if doc is None:
+        increment_generation(key)
+    elif not doc.flags.in_location_import:
+        frappe.db.after_commit.add(partial(increment_generation, key))
+
+
+def get_args_key(args):
+    return hashlib.sha1(json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def cached_response(method, args, generator, ttl=API_CACHE_TTL):
+    """Return generator() cached in Redis for the current generation.
+
+    Inside an HTTP request this returns a JSON response with an ETag, or an empty
+    304 when the client already has the current version.
+    """
+    generation = get_generation()
+    args_key = get_args_key(args)
+    etag = f'"{generation}-{args_key}"'
+
+    request = getattr(frappe.local, "request", None)
+    if request and etag in request.headers.get("If-None-Match", ""):
+        return Response(status=304, headers=get_cache_headers(etag))
+
+    key = f"location_api:{generation}:{method}:{args_key}"
+    data = frappe.cache.get_value(key)
+    if data is None:
+        data = generator()
+        frappe.cache.set_value(key, data, expires_in_sec=ttl)
+
+    if not request:
+        return data
+
+    return Response(
+        frappe.as_json({"message": data}, indent=None, separators=(",", ":")),
+        mimetype="application/json",
+        headers=get_cache_headers(etag),
+    )
+
+
+def get_cache_headers(etag):
+    # Clients may keep the response but must revalidate it with If-None-Match
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
@@ -0,0 +1,112 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Set-based link checks run after bulk writes.
+
+Imports save State and City rows without their per-row validate hooks. These
+passes do the same work for a whole table at once: the State's country code,
+region and subregion follow its Country, and a City's country, codes, region and
+subregion follow its State. Every City and State thus carries its whole ancestor
+path as indexed columns, so reports group by any level with a single join. Rows
+pointing at a parent that does not exist are counted as orphaned.
+filter_unlinked tells which removed rows can be deleted without breaking links.
+"""
+
+import frappe
+
+from erpnext_location.erpnext_location.utils.db import is_distinct, quote_column, update_from
+
+# State columns copied from Country, and City columns copied from State
+STATE_COLUMNS = {"country_code": "code", "region": "region", "subregion": "subregion"}
+CITY_COLUMNS = ("country", "country_code", "state_code", "region", "subregion")
+
+
+def get_scope(column, country_codes):
+    """SQL condition and values limiting a pass to a shard of countries"""
+    if country_codes is None:
+        return "1=1", {}
+    return f"{column} IN %(country_codes)s", {"country_codes": tuple(country_codes) or ("",)}
+
+
+def count(sql, values):
+    return frappe.db.sql(sql, values)[0][0]
+
+
+def reconcile_states(country_codes=None):
+    """Align State.country_code, region and subregion with the linked Country"""
+    state, country = quote_column("tabState"), quote_column("tabCountry")
+    scope, values = get_scope("s.country_code", country_codes)
+
+    orphaned = count(
+        f"SELECT COUNT(*) FROM {state} s LEFT JOIN {country} c ON c.name = s.country "
+        f"WHERE c.name IS NULL AND {scope}",
+        values,
+    )
+
+    mismatch = " OR ".join(is_distinct(f"s.{column}", f"c.{source}") for column, source in STATE_COLUMNS.items())
+    realigned = count(
+        f"SELECT COUNT(*) FROM {state} s JOIN {country} c ON c.name = s.country WHERE ({mismatch}) AND {scope}",
+        values,
+    )
+    if realigned:
+        update_from(
+            "State", "s", "Country", "c", "c.name = s.country",
+            {column: f"c.{source}" for column, source in STATE_COLUMNS.items()},
+            f"({mismatch}) AND {scope}",
+            values,
+        )
+
+    return frappe._dict(realigned=realigned, orphaned=orphaned)
+
+
+def reconcile_cities(country_codes=None):
+    """Align City.country, country_code, state_code, region and subregion with the linked State"""
+    city, state = quote_column("tabCity"), quote_column("tabState")
+
+    scope, values = get_scope("ci.country_code", country_codes)
+    orphaned = count(
+        f"SELECT COUNT(*) FROM {city} ci LEFT JOIN {state} s ON s.name = ci.state "
+        f"WHERE s.name IS NULL AND {scope}",
+        values,
+    )
+
+    scope, values = get_scope("s.country_code", country_codes)
+    mismatch = " OR ".join(is_distinct(f"ci.{column}", f"s.{column}") for column in CITY_COLUMNS)
+    realigned = count(
+        f"SELECT COUNT(*) FROM {city} ci JOIN {state} s ON s.name = ci.state WHERE ({mismatch}) AND {scope}",
+        values,
+    )
+    if realigned:
+        update_from(
+            "City", "ci", "State", "s", "s.name = ci.state",
+            {column: f"s.{column}" for column in CITY_COLUMNS},
+            f"({mismatch}) AND {scope}",
+            values,
+        )
+
+    return frappe._dict(realigned=realigned, orphaned=orphaned)
+
+
+def get_link_fields(doctype):
+    """(doctype, fieldname) of every Link field, standard or custom, pointing at `doctype`"""
+    fields = frappe.get_all(
+        "DocField", filters={"fieldtype": "Link", "options": doctype}, fields=["parent", "fieldname"], as_list=True
+    )
+    fields += frappe.get_all(
+        "Custom Field", filters={"fieldtype": "Link", "options": doctype}, fields=["dt", "fieldname"], as_list=True
+    )
+    return [
+        (parent, fieldname) for parent, fieldname in fields
+        if not frappe.get_meta(parent).issingle and not frappe.get_meta(parent).is_virtual
+    ]
+
+
+def filter_unlinked(doctype, names):
+    """Return the subset of `names` that no other record links to, one query per link field"""
+    unlinked = set(names)
+    for parent, fieldname in get_link_fields(doctype):
+        if not unlinked:
+            break
+        linked = frappe.get_all(parent, filters={fieldname: ["in", list(unlinked)]}, pluck=fieldname, distinct=True)
+        unlinked.difference_update(linked)
+    return unlinked
@@ -0,0 +1,103 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Denormalised counts of active states, active cities and addresses per location.
+
+Region, Subregion, Country and State store their counts so dashboards read one
+row instead of counting tabCity. recompute_counters rebuilds all of them with one
+UPDATE per counter at the end of an import. Between imports, saving or deleting a
+City, State or Address moves its 1 from the counters of its old ancestors to
+those of its new ones.
+"""
+
+import frappe
+
+from erpnext_location.erpnext_location.utils.db import quote_column
+
+# Counters of each doctype, and how the counted rows reach it:
+# (counter, counted doctype, SQL condition tying a counted row `x` to the node)
+COUNTERS = {
+    "Region": [
+        ("active_states", "State", "x.region = {node}.name AND x.is_active = 1"),
+        ("active_cities", "City", "x.region = {node}.name AND x.is_active = 1"),
+        ("linked_addresses", "Address", "x.country IN (SELECT c.name FROM {country} c WHERE c.region = {node}.name)"),
+    ],
+    "Subregion": [
+        ("active_states", "State", "x.subregion = {node}.name AND x.is_active = 1"),
+        ("active_cities", "City", "x.subregion = {node}.name AND x.is_active = 1"),
+        ("linked_addresses", "Address", "x.country IN (SELECT c.name FROM {country} c WHERE c.subregion = {node}.name)"),
+    ],
+    "Country": [
+        ("active_states", "State", "x.country = {node}.name AND x.is_active = 1"),
+        ("active_cities", "City", "x.country = {node}.name AND x.is_active = 1"),
+        ("linked_addresses", "Address", "x.country = {node}.name"),
+    ],
+    "State": [
+        ("active_cities", "City", "x.state = {node}.name AND x.is_active = 1"),
+        ("linked_addresses", "Address", "x.location_state = {node}.name"),
+    ],
+}
+
+
+def recompute_counters(counters=None):
+    """Recompute every counter, or only those named in `counters`, with one UPDATE each"""
+    has_address_links = frappe.get_meta("Address").has_field("location_state")
+    for doctype, node_counters in COUNTERS.items():
+        node = quote_column(f"tab{doctype}")
+        for counter, counted, condition in node_counters:
+            if counters and counter not in counters:
+                continue
+            if counted == "Address" and not has_address_links:
+                continue
+            condition = condition.format(node=node, country=quote_column("tabCountry"))
+            frappe.db.sql(
+                f"UPDATE {node} SET {counter} = "
+                f"(SELECT COUNT(*) FROM {quote_column(f'tab{counted}')} x WHERE {condition})"
+            )
+
+
+def get_contribution(doc):
+    """(counter, {ancestor doctype: name}) that a City, State or Address adds 1 to, or None"""
+    if doc.doctype == "Address":
+        region, subregion = (
+            frappe.get_cached_value("Country", doc.country, ["region", "subregion"]) if doc.country else (None, None)
+        )
+        ancestors = {"State": doc.get("location_state"), "Country": doc.country, "Region": region, "Subregion": subregion}
+        return "linked_addresses", ancestors
+
+    if not doc.is_active:
+        return None
+    ancestors = {"Country": doc.country, "Region": doc.region, "Subregion": doc.subregion}
+    if doc.doctype == "City":
+        ancestors["State"] = doc.state
+        return "active_cities", ancestors
+    return "active_states", ancestors
+
+
+def adjust(contribution, delta):
+    if not contribution:
+        return
+    counter, ancestors = contribution
+    for doctype, name in ancestors.items():
+        if name:
+            column = quote_column(counter)
+            frappe.db.sql(
+                f"UPDATE {quote_column(f'tab{doctype}')} SET {column} = {column} + %s WHERE name = %s",
+                (delta, name),
+            )
+
+
+def update_counters(doc, method=None):
+    """on_update/on_trash handler: move the record's 1 from its old ancestors' counters to its new ones"""
+    if doc.flags.in_location_import:
+        return
+
+    if method == "on_trash":
+        adjust(get_contribution(doc), -1)
+        return
+
+    before = doc.get_doc_before_save()
+    old, new = get_contribution(before) if before else None, get_contribution(doc)
+    if old != new:
+        adjust(old, -1)
+        adjust(new, 1)
@@ -2,18 +2,96 @@
 # MIT License
 
 import frappe
-import requests
+import hashlib
 import json
 import os
+import time
+import traceback
 from frappe.utils import cint, flt, now
 
+from erpnext_location.erpnext_location.utils.bundles import build_bundles
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+from erpnext_location.erpnext_location.utils.consistency import filter_unlinked, reconcile_cities, reconcile_states
+from erpnext_location.erpnext_location.utils.counters import recompute_counters
+from erpnext_location.erpnext_location.utils.db import upsert
+from erpnext_location.erpnext_location.utils.formats import get_format, get_peak_memory_mb
+from erpnext_location.erpnext_location.utils.geo import get_geohash, invalidate_city_index
+from erpnext_location.erpnext_location.utils.lookup import clear_state_parent, load_countries, load_state_parents
+from erpnext_location.erpnext_location.utils.metrics import instrumented_stage
+from erpnext_location.erpnext_location.utils.search import is_stale, rebuild_search_index
+from erpnext_location.erpnext_location.utils.sources import get_source
+
+# Fields that describe the write, or are derived from other fields, left out of source_hash
+HASH_EXCLUDED_FIELDS = ("name", "last_updated", "source_hash", "is_active", "geohash")
+
+# Fields compared by a dry run, besides the bookkeeping ones above
+DIFF_EXCLUDED_FIELDS = ("name", "last_updated", "source_hash")
+
+# Import stages in the order they run, as recorded on Location Import Checkpoint
+STAGES = ("regions", "subregions", "countries", "states", "cities")
+STAGE_DOCTYPES = {
+    "regions": "Region",
+    "subregions": "Subregion",
+    "countries": "Country",
+    "states": "State",
+    "cities": "City",
+}
+# Levels a country, state or city can do without; a run that cannot read them skips the level
+OPTIONAL_STAGES = ("regions", "subregions")
+
+
+def values_differ(current, new):
+    """Whether a stored value differs from a mapped source value, ignoring None/"" and float noise"""
+    if isinstance(new, (int, float)) or isinstance(current, (int, float)):
+        return round(flt(current), 8) != round(flt(new), 8)
+    return (current or "") != (new or "")
+
 
 class LocationDataImporter:
     """Import location data from dr5hn/countries-states-cities-database"""
 
-    def __init__(self):
-        self.base_url = "https://raw.githubusercontent.com/dr5hn/countries-states-cities-database/master/json"
+    def __init__(self, bulk=False, streaming=False, source=None, incremental=False, data_format=None, delete_removed=False, dry_run=False, full_snapshot=False):
+        # Export format (json, json.gz, csv or sqlite) and the URL, local directory or
+        # file:// path its files are read from
+        self.data_format = get_format(data_format)
+        self.source = get_source(source, self.data_format.directory)
         self.batch_size = 100
+        # Bulk mode writes rows with multi-row upserts instead of saving one document at a time
+        self.bulk = bulk
+        self.bulk_batch_size = 1000
+        # Streaming mode reads states and cities record by record instead of loading whole files
+        self.streaming = streaming
+        self.stream_chunk_size = 64 * 1024
+        # Incremental mode only writes rows whose source_hash changed, regardless of force_update
+        self.incremental = incremental
+        # Rows no longer upstream are deactivated; with delete_removed, those nothing links to are deleted
+        self.delete_removed = delete_removed
+        # Whether the source is the complete upstream dataset. Only then can an unscoped stage
+        # tell which rows were removed; other runs only deactivate within their country_codes
+        self.full_snapshot = full_snapshot
+        # A dry run reads the source and the database but writes nothing; it records a diff instead
+        self.dry_run = dry_run
+        self.diff = {}
+        self.diff_sample_size = 50
+        # Rows a dry run would insert or update, so later stages resolve parents against them
+        self.planned = {}
+        # Lowercase iso2 codes limiting the state and city stages to a shard of countries
+        self.country_codes = None
+        # Location Import Checkpoint of the current run, when the run is resumable
+        self.checkpoint = None
+        self.stats = {}
+        # Location Import Log of the current run and the per-stage metrics written to it
+        self.import_log = None
+        self.run_started = None
+        self.stage_metrics = {}
+        self.current_stage = None
+        # The first failing or unresolved rows of each doctype, kept for the import log
+        self.failure_samples = []
+        self.failure_count = 0
+        self.max_failure_samples = 20
+        # external_ids of upstream records that failed to import, per doctype; they are
+        # still upstream, so their existing rows are not deactivated
+        self.failed_external_ids = {}
 
     def safe_set_field(self, doc, field_name, value, default=""):
         """Safely set a field value on a document if the field exists"""
@@ -22,9 +100,610 @@ class LocationDataImporter:
             return True
         return False
 
+    def in_scope(self, country_code):
+        """Whether a record of the given country belongs to this importer's shard"""
+        return self.country_codes is None or country_code in self.country_codes
+
+    def get_scope_filters(self, doctype):
+        """Filters restricting existing rows of `doctype` to this importer's shard"""
+        if self.country_codes is not None and doctype in ("State", "City"):
+            return {"country_code": ["in", list(self.country_codes)]}
+        return {}
+
+    def start_checkpoint(self, run_id, options=None):
+        """Attach a persisted checkpoint to this run, resuming it if it already exists"""
+        if frappe.db.exists("Location Import Checkpoint", run_id):
+            checkpoint = frappe.get_doc("Location Import Checkpoint", run_id)
+            if checkpoint.status in ("Completed", "Abandoned"):
+                frappe.throw(f"Location import {run_id} is {checkpoint.status.lower()} and cannot be resumed")
+            frappe.logger().info(f"Resuming location import {run_id} at {checkpoint.stage} (offset {checkpoint.batch_offset})")
+        else:
+            checkpoint = frappe.get_doc({
+                "doctype": "Location Import Checkpoint",
+                "run_id": run_id,
+                "options": json.dumps(options or {}, indent=1),
+            }).insert(ignore_permissions=True)
+
+        checkpoint.db_set({"status": "Running", "error": None})
+        frappe.db.commit()
+        self.checkpoint = checkpoint
+        return checkpoint
+
+    def finish_checkpoint(self, status, error=None):
+        """Record the outcome of a checkpointed run"""
+        if not self.checkpoint:
+            return
+
+        self.checkpoint.db_set({"status": status, "error": error})
+        frappe.db.commit()
+
+    def start_import_log(self, run_id=None):
+        """Create the Location Import Log that this run's metrics are written to"""
+        self.run_started = time.monotonic()
+        if self.dry_run:
+            return None
+
+        self.import_log = frappe.get_doc({
+            "doctype": "Location Import Log",
+            "run_id": run_id,
+            "status": "Running",
+            "data_format": self.data_format.name,
+            "source": self.source.describe(),
+            "started_at": now(),
+        }).insert(ignore_permissions=True)
+        frappe.db.commit()
+        return self.import_log
+
+    def save_import_log(self, status=None, error=None):
+        """Write the collected stage metrics and failure samples to the import log"""
+        if not self.import_log:
+            return
+
+        log = self.import_log
+        log.set("stages", list(self.stage_metrics.values()))
+        log.failed_rows = self.failure_count
+        log.failures = json.dumps(self.failure_samples, indent=1, default=str)
+        log.peak_memory_mb = get_peak_memory_mb()
+        log.duration = time.monotonic() - self.run_started
+        if status:
+            log.status = status
+            log.error = error
+            log.finished_at = now()
+
+        log.save(ignore_permissions=True)
+        frappe.db.commit()
+
+    def start_stage_metrics(self, stage):
+        self.current_stage = stage
+        self.stage_metrics[stage] = frappe._dict(
+            stage=stage,
+            import_doctype=STAGE_DOCTYPES[stage],
+            started_at=now(),
+            started=time.monotonic(),
+            rows_read=0,
+            queries=0,
+            commits=0,
+            download_bytes=0,
+            download_duration=0,
+        )
+
+    def finish_stage_metrics(self, stage, queries, succeeded=True):
+        """Close the metrics of a stage and, if it succeeded, persist them"""
+        metrics = self.stage_metrics[stage]
+        metrics.duration = time.monotonic() - metrics.pop("started")
+        metrics.queries = queries
+        metrics.peak_memory_mb = get_peak_memory_mb()
+
+        stats = self.get_stats(metrics.import_doctype)
+        metrics.update({counter: stats[counter] for counter in ("inserted", "updated", "unchanged", "skipped", "failed")})
+
+        transfer = self.source.pop_transfer(self.data_format.get_filename(stage))
+        if transfer:
+            metrics.download_bytes = transfer["bytes"]
+            metrics.download_duration = transfer["seconds"]
+
+        self.current_stage = None
+        frappe.logger().info(
+            f"Stage {stage}: {metrics.rows_read} rows read in {metrics.duration:.2f}s, {metrics.queries} queries, "
+            f"{metrics.commits} commits, {metrics.download_bytes} bytes downloaded, peak memory {metrics.peak_memory_mb} MB"
+        )
+        if succeeded:
+            self.save_import_log()
+
+    def add_stage_metric(self, key, value=1):
+        """Add to a counter of the running stage"""
+        if self.current_stage:
+            self.stage_metrics[self.current_stage][key] += value
+
+    def record_failure(self, doctype, row, reason):
+        """Count a row that could not be imported, keeping a sample for the import log"""
+        if self.dry_run:
+            diff = self.get_diff(doctype)
+            diff.unresolved += 1
+            self.add_diff_sample(diff, "unresolved", {"name": row.get("name"), "reason": reason})
+
+        self.failure_count += 1
+        external_id = row.get("external_id") or row.get("id")
+        if external_id:
+            self.failed_external_ids.setdefault(doctype, set()).add(str(external_id))
+        if sum(1 for sample in self.failure_samples if sample["doctype"] == doctype) < self.max_failure_samples:
+            self.failure_samples.append({
+                "doctype": doctype,
+                "name": row.get("name"),
+                "external_id": row.get("external_id") or row.get("id"),
+                "reason": reason,
+            })
+
+    def begin_stage(self, stage):
+        """Move the checkpoint to `stage` and return how many mapped records to skip.
+
+        Returns None when the checkpoint is already past this stage. A stage is only
+        resumed mid-way when its data file still has the checksum recorded earlier.
+        """
+        if not self.checkpoint:
+            return 0
+
+        checkpoint = self.checkpoint
+        if STAGES.index(stage) < STAGES.index(checkpoint.stage):
+            frappe.logger().info(f"Skipping {stage}, already completed in run {checkpoint.run_id}")
+            return None
+
+        filename = self.data_format.get_filename(stage)
+        checksum = self.source.checksum(filename)
+        offset = 0
+        if checkpoint.stage == stage and checkpoint.batch_offset:
+            if checkpoint.source_checksum == checksum:
+                offset = checkpoint.batch_offset
+                frappe.logger().info(f"Resuming {stage} after {offset} records (last external_id {checkpoint.last_external_id})")
+            else:
+                frappe.logger().info(f"{filename} changed since the checkpoint, restarting {stage}")
+
+        checkpoint.db_set({
+            "stage": stage,
+            "batch_offset": offset,
+            "last_external_id": checkpoint.last_external_id if offset else None,
+            "source_checksum": checksum,
+        })
+        frappe.db.commit()
+        return offset
+
+    def get_stats(self, doctype):
+        """Per-doctype counters for the current run"""
+        if doctype not in self.stats:
+            self.stats[doctype] = frappe._dict(
+                inserted=0, updated=0, unchanged=0, skipped=0, failed=0, removed=0, reactivated=0, deleted=0,
+                realigned=0, orphaned=0
+            )
+        return self.stats[doctype]
+
+    def get_diff(self, doctype):
+        """Dry-run details for `doctype`, on top of the counters in its stats"""
+        if doctype not in self.diff:
+            self.diff[doctype] = frappe._dict(
+                changed_fields={},
+                deactivations=0,
+                reactivations=0,
+                unresolved=0,
+                samples=frappe._dict(inserts=[], updates=[], deactivations=[], reactivations=[], unresolved=[]),
+            )
+        return self.diff[doctype]
+
+    def add_diff_sample(self, diff, kind, item):
+        if len(diff.samples[kind]) < self.diff_sample_size:
+            diff.samples[kind].append(item)
+
+    def get_dry_run_report(self):
+        """Per-doctype diff of what the run would insert, update and deactivate"""
+        report = {}
+        for doctype, stats in self.stats.items():
+            diff = self.get_diff(doctype)
+            report[doctype] = {
+                "inserts": stats.inserted,
+                "updates": stats.updated,
+                "unchanged": stats.unchanged,
+                "skipped": stats.skipped,
+                "deactivations": diff.deactivations,
+                "reactivations": diff.reactivations,
+                "unresolved_parents": diff.unresolved,
+                "changed_fields": diff.changed_fields,
+                "samples": diff.samples,
+            }
+        return report
+
+    def compute_source_hash(self, row):
+        """Compact fingerprint of the mapped source fields of a row"""
+        values = {key: value for key, value in row.items() if key not in HASH_EXCLUDED_FIELDS}
+        payload = json.dumps(values, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+    def load_name_map(self, doctype, key_field, filters=None):
+        """Load a {key_field: name} map for a whole table in one query"""
+        name_map = {
+            str(key): name
+            for key, name in frappe.get_all(
+                doctype, filters=filters, fields=[key_field, "name"], as_list=True
+            )
+            if key
+        }
+        for name, row in self.planned.get(doctype, {}).items():
+            if row.get(key_field):
+                name_map[str(row[key_field])] = name
+        return name_map
+
+    def load_country_maps(self):
+        """Load country lookup maps keyed by lowercase iso2 code, iso3 code and name"""
+        fields = ["iso3"] if frappe.get_meta("Country").has_field("iso3") else []
+
+        by_code, by_iso3, by_name = {}, {}, {}
+        for country in load_countries(fields):
+            by_name[country.name] = country.name
+            if country.code:
+                by_code[country.code.lower()] = country.name
+            if country.get("iso3"):
+                by_iso3[country.iso3.lower()] = country.name
+
+        for name, row in self.planned.get("Country", {}).items():
+            by_name[name] = name
+            if row.get("code"):
+                by_code[row["code"]] = name
+            if row.get("iso3"):
+                by_iso3[row["iso3"]] = name
+
+        return by_code, by_iso3, by_name
+
+    def load_state_map(self):
+        """Load {(country_code, state name): (country, country_code, state_code)} for every state.
+
+        Keyed by country too, as state names repeat across countries (Punjab in IN and PK)
+        and a city must only resolve to the state of its own country.
+        """
+        states = {(state.country_code, name): state for name, state in load_state_parents().items()}
+        for name, row in self.planned.get("State", {}).items():
+            states[(row["country_code"], name)] = frappe._dict(
+                name=name, country=row["country"], country_code=row["country_code"], state_code=row["state_code"]
+            )
+        return states
+
+    def iter_batches(self, records, size):
+        """Yield lists of at most `size` records from any iterable"""
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def import_rows(self, doctype, rows, force_update=False, bulk=False, resume_from=0):
+        """Write mapped rows in batches, committing after each batch.
+
+        The first `resume_from` rows were committed by an earlier attempt of this run
+        and are only tracked, not written again. After every batch the checkpoint
+        offset is updated in the same transaction as the data.
+        Returns the number of rows inserted or updated.
+        """
+        stats = self.get_stats(doctype)
+        imported_count = 0
+        batch_count = 0
+        offset = 0
+        seen_names = set()
+        seen_external_ids = set()
+        batch_size = self.bulk_batch_size if bulk else self.batch_size
+
+        for batch in self.iter_batches(rows, batch_size):
+            batch_count += 1
+            offset += len(batch)
+
+            if offset <= resume_from:
+                seen_names.update(row["name"] for row in batch)
+                seen_external_ids.update(row["external_id"] for row in batch if row.get("external_id"))
+                continue
+
+            # Keep the first occurrence of each name across the whole run
+            unique_rows = []
+            for row in batch:
+                if row["name"] in seen_names:
+                    stats.skipped += 1
+                    continue
+                seen_names.add(row["name"])
+                unique_rows.append(row)
+                if row.get("external_id"):
+                    seen_external_ids.add(row["external_id"])
+
+            imported_count += self.write_rows(doctype, unique_rows, force_update, bulk)
+            if self.dry_run:
+                continue
+            if self.checkpoint:
+                self.checkpoint.db_set(
+                    {"batch_offset": offset, "last_external_id": batch[-1].get("external_id")},
+                    update_modified=False
+                )
+            frappe.db.commit()
+            self.add_stage_metric("commits")
+            frappe.logger().info(f"Processed {doctype} batch {batch_count}, imported {imported_count} so far...")
+
+        self.reconcile_removed(doctype, seen_external_ids)
+        if not self.dry_run:
+            # Cached API responses and spatial indexes are rebuilt for the new data
+            bump_generation()
+            if doctype == "City":
+                invalidate_city_index()
+        return imported_count
+
+    def write_rows(self, doctype, rows, force_update=False, bulk=False):
+        """Write a batch of mapped rows (dicts keyed by fieldname, including a unique `name`).
+
+        In bulk mode new and changed rows are written with native upserts, otherwise
+        they are saved as documents. Existing rows are updated when force_update is set,
+        or in incremental mode when their source_hash changed.
+        Returns the number of rows inserted or updated.
+        """
+        stats = self.get_stats(doctype)
+        meta = frappe.get_meta(doctype)
+        has_hash = meta.has_field("source_hash")
+
+        unique_rows = {row["name"]: row for row in rows}
+        if not unique_rows:
+            return 0
+
+        last_updated = now()
+        for row in unique_rows.values():
+            if has_hash:
+                row["source_hash"] = self.compute_source_hash(row)
+            row["last_updated"] = last_updated
+
+        # {name: stored source_hash} for rows that already exist
+        filters = {"name": ["in", list(unique_rows)]}
+        if has_hash:
+            existing = dict(frappe.get_all(doctype, filters=filters, fields=["name", "source_hash"], as_list=True))
+        else:
+            existing = dict.fromkeys(frappe.get_all(doctype, filters=filters, pluck="name"))
+
+        new_rows, changed_rows = [], []
+        for name, row in unique_rows.items():
+            if name not in existing:
+                new_rows.append(row)
+            elif self.incremental and has_hash:
+                if existing[name] == row["source_hash"]:
+                    stats.unchanged += 1
+                else:
+                    changed_rows.append(row)
+            elif force_update:
+                changed_rows.append(row)
+            else:
+                stats.skipped += 1
+
+        if self.dry_run:
+            return self.plan_rows(doctype, new_rows, changed_rows)
+
+        if bulk:
+            # New and changed rows go out together as batched native upserts
+            self.upsert_rows(doctype, new_rows + changed_rows, last_updated)
+            inserted, updated = len(new_rows), len(changed_rows)
+        else:
+            inserted = sum(1 for row in new_rows if self.save_row(doctype, row))
+            updated = sum(1 for row in changed_rows if self.save_row(doctype, row, existing=True))
+
+        stats.inserted += inserted
+        stats.updated += updated
+        return inserted + updated
+
+    def plan_rows(self, doctype, new_rows, changed_rows):
+        """Record what write_rows would do, comparing changed rows field by field"""
+        stats = self.get_stats(doctype)
+        diff = self.get_diff(doctype)
+        meta = frappe.get_meta(doctype)
+        planned = self.planned.setdefault(doctype, {}) if doctype != "City" else {}
+
+        for row in new_rows:
+            planned[row["name"]] = row
+            self.add_diff_sample(diff, "inserts", row["name"])
+        stats.inserted += len(new_rows)
+
+        columns = [
+            column for column in dict.fromkeys(key for row in changed_rows for key in row)
+            if column not in DIFF_EXCLUDED_FIELDS and meta.has_field(column)
+        ]
+        existing = {
+            row.name: row
+            for row in frappe.get_all(
+                doctype, filters={"name": ["in", [row["name"] for row in changed_rows]]}, fields=["name", *columns]
+            )
+        } if changed_rows else {}
+
+        updated = 0
+        for row in changed_rows:
+            current = existing.get(row["name"], {})
+            changes = {
+                column: [current.get(column), row[column]]
+                for column in columns
+                if column in row and values_differ(current.get(column), row[column])
+            }
+            if not changes:
+                stats.unchanged += 1
+                continue
+
+            updated += 1
+            planned[row["name"]] = row
+            for column in changes:
+                diff.changed_fields[column] = diff.changed_fields.get(column, 0) + 1
+            self.add_diff_sample(diff, "updates", {"name": row["name"], "changes": changes})
+
+        stats.updated += updated
+        return len(new_rows) + updated
+
+    def upsert_rows(self, doctype, rows, timestamp):
+        """Insert or update rows without the document lifecycle.
+
+        Only the mapped columns (plus modified/modified_by) are overwritten on
+        existing rows; creation and owner are kept.
+        """
+        if not rows:
+            return
+
+        meta = frappe.get_meta(doctype)
+        columns = [
+            column for column in dict.fromkeys(key for row in rows for key in row)
+            if column == "name" or meta.has_field(column)
+        ]
+        user = frappe.session.user
+        fields = ["owner", "modified_by", "creation", "modified", "docstatus", "idx", *columns]
+        values = [
+            (user, user, timestamp, timestamp, 0, 0, *(row.get(column) for column in columns))
+            for row in rows
+        ]
+        update_fields = ["modified_by", "modified", *(column for column in columns if column != "name")]
+        upsert(doctype, fields, values, update_fields, chunk_size=self.bulk_batch_size)
+
+    def save_row(self, doctype, row, existing=False):
+        """Save one mapped row through the document lifecycle"""
+        try:
+            doc = frappe.get_doc(doctype, row["name"]) if existing else frappe.new_doc(doctype)
+            for fieldname, value in row.items():
+                if fieldname != "name":
+                    self.safe_set_field(doc, fieldname, value)
+
+            if doctype == "Country":
+                doc.flags.ignore_mandatory = True
+            # Parents were resolved from the importer's maps; links are checked set-based after the
+            # State and City stages, and counters and cached responses are refreshed once per stage
+            doc.flags.in_location_import = True
+
+            doc.save(ignore_permissions=True)
+            return True
+
+        except Exception as e:
+            self.get_stats(doctype).failed += 1
+            self.record_failure(doctype, row, str(e))
+            frappe.logger().error(f"Error importing {doctype} {row.get('name', 'Unknown')}: {str(e)}")
+            return False
+
+    def reconcile_links(self, doctype):
+        """Check and backfill the parent links of a State or City stage in one pass"""
+        if self.dry_run:
+            return
+
+        reconcile = reconcile_states if doctype == "State" else reconcile_cities
+        result = reconcile(self.country_codes)
+        frappe.db.commit()
+        if doctype == "State":
+            # Upserted states bypass State.on_update, which normally drops cached lookups
+            clear_state_parent()
+        if result.realigned:
+            bump_generation()
+            if doctype == "City":
+                invalidate_city_index()
+
+        stats = self.get_stats(doctype)
+        stats.realigned += result.realigned
+        stats.orphaned = result.orphaned
+        if result.realigned or result.orphaned:
+            frappe.logger().info(
+                f"{doctype}: realigned {result.realigned} rows with their parent, {result.orphaned} rows have no parent"
+            )
+
+    def refresh_counters(self):
+        """Recompute the per-location counts once all stages have written their rows"""
+        if self.dry_run:
+            return
+
+        recompute_counters()
+        frappe.db.commit()
+
+    def refresh_bundles(self):
+        """Write the per-country client bundles of states and cities"""
+        if self.dry_run:
+            return
+
+        build_bundles()
+
+    def refresh_search_index(self, doctype):
+        """Rebuild the typeahead index of a State or City stage that changed rows"""
+        if self.dry_run or not is_stale(doctype, self.get_stats(doctype)):
+            return
+
+        rebuild_search_index(doctype, self.country_codes)
+        frappe.db.commit()
+
+    def reconcile_removed(self, doctype, seen_external_ids):
+        """Deactivate rows that are no longer upstream and reactivate rows that came back.
+
+        Reads (name, external_id, is_active) tuples only and writes one UPDATE per
+        batch. Doctypes without is_active only count their removed rows.
+        """
+        meta = frappe.get_meta(doctype)
+        if not seen_external_ids or not meta.has_field("external_id"):
+            return
+        scope_filters = self.get_scope_filters(doctype)
+        if not (self.full_snapshot or self.dry_run) and not scope_filters:
+            # A partial or filtered source says nothing about the rows it did not contain.
+            # A dry run still reports them, as the preview of a full_snapshot run
+            return
+
+        stats = self.get_stats(doctype)
+        seen_external_ids = seen_external_ids | self.failed_external_ids.get(doctype, set())
+        # Only rows of the scope's countries, matching the country_code the rows were stored with
+        filters = {"external_id": ["is", "set"], **scope_filters}
+        if not meta.has_field("is_active"):
+            existing_ids = frappe.get_all(doctype, filters=filters, pluck="external_id")
+            stats.removed = len(set(existing_ids) - seen_external_ids)
+            return
+
+        stale, inactive, revived = [], [], []
+        for name, external_id, is_active in frappe.get_all(
+            doctype, filters=filters, fields=["name", "external_id", "is_active"], as_list=True
+        ):
+            if external_id in seen_external_ids:
+                if not is_active:
+                    revived.append(name)
+            elif is_active:
+                stale.append(name)
+            else:
+                inactive.append(name)
+
+        if self.dry_run:
+            diff = self.get_diff(doctype)
+            diff.deactivations, diff.reactivations = len(stale), len(revived)
+            diff.samples.deactivations = stale[:self.diff_sample_size]
+            diff.samples.reactivations = revived[:self.diff_sample_size]
+            return
+
+        for names, is_active in ((stale, 0), (revived, 1)):
+            for batch in self.iter_batches(names, self.bulk_batch_size):
+                frappe.db.set_value(doctype, {"name": ["in", batch]}, "is_active", is_active)
+                frappe.db.commit()
+
+        stats.removed = len(stale)
+        stats.reactivated = len(revived)
+        if stale or revived:
+            frappe.logger().info(f"{doctype}: deactivated {len(stale)} rows removed upstream, reactivated {len(revived)}")
+
+        if self.delete_removed:
+            self.delete_unlinked(doctype, stale + inactive)
+
+    def delete_unlinked(self, doctype, names):
+        """Delete inactive rows that no other record links to"""
+        stats = self.get_stats(doctype)
+        for batch in self.iter_batches(names, self.bulk_batch_size):
+            unlinked = filter_unlinked(doctype, batch)
+            if unlinked:
+                frappe.db.delete(doctype, {"name": ["in", list(unlinked)]})
+                frappe.db.commit()
+                stats.deleted += len(unlinked)
+
+        if stats.deleted:
+            frappe.logger().info(f"{doctype}: deleted {stats.deleted} removed rows without links")
+
     def import_all_data(self, force_update=False):
         """Import all location data (regions, subregions, countries, states, cities)"""
         frappe.logger().info("Starting location data import from GitHub repository")
+        if not self.import_log:
+            self.start_import_log(self.checkpoint.run_id if self.checkpoint else None)
+
+        # Stages a resumed run has already completed need no download
+        first_stage = STAGES.index(self.checkpoint.stage) if self.checkpoint else 0
+        self.prefetch(STAGES[first_stage:])
 
         try:
             # Import regions first
@@ -47,8 +726,20 @@ class LocationDataImporter:
             cities_imported = self.import_cities(force_update)
             frappe.logger().info(f"Cities imported: {cities_imported}")
 
+            self.refresh_counters()
+            self.refresh_bundles()
+
             # Update import log
             self.log_import_completion(regions_imported, subregions_imported, countries_imported, states_imported, cities_imported)
+            self.finish_checkpoint("Completed")
+            self.save_import_log("Completed")
+
+            if self.dry_run:
+                return {
+                    "status": "dry_run",
+                    "diff": self.get_dry_run_report(),
+                    "peak_memory_mb": get_peak_memory_mb()
+                }
 
             return {
                 "status": "success",
@@ -56,394 +747,402 @@ class LocationDataImporter:
                 "subregions": subregions_imported,
                 "countries": countries_imported,
                 "states": states_imported,
-                "cities": cities_imported
+                "cities": cities_imported,
+                "stats": self.stats,
+                "peak_memory_mb": get_peak_memory_mb()
             }
 
         except Exception as e:
             frappe.logger().error(f"Location data import failed: {str(e)}")
+            frappe.db.rollback()
+            self.finish_checkpoint("Failed", traceback.format_exc())
+            self.save_import_log("Failed", traceback.format_exc())
             raise
 
+    @instrumented_stage("regions")
     def import_regions(self, force_update=False):
         """Import regions data"""
         frappe.logger().info("Importing regions data...")
 
-        regions_data = self.download_data("region.json")
-        if not regions_data:
+        resume_from = self.begin_stage("regions")
+        if resume_from is None:
             return 0
 
-        imported_count = 0
-        for region in regions_data:
-            # try:
-            # Check if region already exists
-            existing_region = frappe.db.exists("Region", {"external_id": str(region["id"])})
-
-            if existing_region and not force_update:
-                continue
-
-            if existing_region:
-                region_doc = frappe.get_doc("Region", existing_region)
-            else:
-                region_doc = frappe.new_doc("Region")
-
-            # Map region data
-            region_doc.region_name = region["name"]
-            self.safe_set_field(region_doc, 'wikidata_id', region.get("wikiDataId", ""))
-            self.safe_set_field(region_doc, 'external_id', str(region["id"]))
-            self.safe_set_field(region_doc, 'last_updated', now())
-
-            region_doc.save(ignore_permissions=True)
-            imported_count += 1
+        regions_data = self.download_data("regions")
+        if not regions_data:
+            return 0
 
-            if imported_count % 10 == 0:
-                frappe.db.commit()
+        existing_regions = self.load_name_map("Region", "external_id")
 
-            # except Exception as e:
-            #     frappe.logger().error(f"Error importing region {region.get('name', 'Unknown')}: {str(e)}")
-            #     continue
+        def rows():
+            for region in regions_data:
+                yield {
+                    "name": existing_regions.get(str(region["id"])) or region["name"],
+                    "region_name": region["name"],
+                    "wikidata_id": region.get("wikiDataId", ""),
+                    "external_id": str(region["id"]),
+                }
 
-        frappe.db.commit()
+        imported_count = self.import_rows("Region", rows(), force_update, resume_from=resume_from)
         frappe.logger().info(f"Successfully imported {imported_count} regions")
         return imported_count
 
+    @instrumented_stage("subregions")
     def import_subregions(self, force_update=False):
         """Import subregions data"""
         frappe.logger().info("Importing subregions data...")
 
-        subregions_data = self.download_data("subregions.json")
-        if not subregions_data:
+        resume_from = self.begin_stage("subregions")
+        if resume_from is None:
             return 0
 
-        imported_count = 0
-        for subregion in subregions_data:
-            # try:
-            # Check if subregion already exists
-            existing_subregion = frappe.db.exists("Subregion", {"external_id": str(subregion["id"])})
-
-            if existing_subregion and not force_update:
-                continue
-
-            # Find parent region
-            region_external_id = str(subregion["region_id"])
-            region_name = frappe.db.get_value("Region", {"external_id": region_external_id}, "name")
-
-            if not region_name:
-                frappe.logger().warning(f"Region not found for subregion {subregion['name']} (region_id: {region_external_id})")
-                continue
-
-            if existing_subregion:
-                subregion_doc = frappe.get_doc("Subregion", existing_subregion)
-            else:
-                subregion_doc = frappe.new_doc("Subregion")
+        subregions_data = self.download_data("subregions")
+        if not subregions_data:
+            return 0
 
-            # Map subregion data
-            subregion_doc.subregion_name = subregion["name"]
-            subregion_doc.region = region_name
-            self.safe_set_field(subregion_doc, 'wikidata_id', subregion.get("wikiDataId", ""))
-            self.safe_set_field(subregion_doc, 'external_id', str(subregion["id"]))
-            self.safe_set_field(subregion_doc, 'last_updated', now())
+        regions = self.load_name_map("Region", "external_id")
+        existing_subregions = self.load_name_map("Subregion", "external_id")
+        stats = self.get_stats("Subregion")
 
-            subregion_doc.save(ignore_permissions=True)
-            imported_count += 1
+        def rows():
+            for subregion in subregions_data:
+                # Find parent region
+                region_external_id = str(subregion["region_id"])
+                region_name = regions.get(region_external_id)
 
-            if imported_count % 10 == 0:
-                frappe.db.commit()
+                if not region_name:
+                    frappe.logger().warning(f"Region not found for subregion {subregion['name']} (region_id: {region_external_id})")
+                    stats.skipped += 1
+                    self.record_failure("Subregion", subregion, f"Region {region_external_id} not found")
+                    continue
 
-            # except Exception as e:
-            #     frappe.logger().error(f"Error importing subregion {subregion.get('name', 'Unknown')}: {str(e)}")
-            #     continue
+                yield {
+                    "name": existing_subregions.get(str(subregion["id"])) or subregion["name"],
+                    "subregion_name": subregion["name"],
+                    "region": region_name,
+                    "wikidata_id": subregion.get("wikiDataId", ""),
+                    "external_id": str(subregion["id"]),
+                }
 
-        frappe.db.commit()
+        imported_count = self.import_rows("Subregion", rows(), force_update, bulk=self.bulk, resume_from=resume_from)
         frappe.logger().info(f"Successfully imported {imported_count} subregions")
         return imported_count
 
+    @instrumented_stage("countries")
     def import_countries(self, force_update=False):
         """Import countries data"""
         frappe.logger().info("Importing countries data...")
 
+        resume_from = self.begin_stage("countries")
+        if resume_from is None:
+            return 0
+
         # Download countries data
-        countries_data = self.download_data("countries.json")
+        countries_data = self.download_data("countries")
         if not countries_data:
             return 0
 
-        imported_count = 0
+        countries_by_code, countries_by_iso3, countries_by_name = self.load_country_maps()
+        regions = self.load_name_map("Region", "region_name")
+        subregions = self.load_name_map("Subregion", "subregion_name")
 
-        for country in countries_data:
-            try:
-                country_name = country.get("name", "").strip()
-                iso2_code = country.get("iso2", "").strip().lower()
+        def rows():
+            for country in countries_data:
+                country_name = (country.get("name") or "").strip()
+                iso2_code = (country.get("iso2") or "").strip().lower()
+                iso3_code = (country.get("iso3") or "").strip().lower()
                 if not country_name:
                     continue
 
                 # Check if country exists
                 # Prefer iso2 (code), then iso3, then name for lookup
-                existing_country = None
-                existing_country_name = None
-
-                if country.get("iso2"):
-                    existing_country_name = frappe.db.get_value("Country", {"code": country.get("iso2", "").strip().lower()}, "country_name")
-                    if existing_country_name:
-                        existing_country = existing_country_name
-
-                if not existing_country and country.get("iso3"):
-                    existing_country_name = frappe.db.get_value("Country", {"iso3": country.get("iso3", "").strip().lower()}, "country_name")
-                    if existing_country_name:
-                        existing_country = existing_country_name
+                existing_country = (
+                    (iso2_code and countries_by_code.get(iso2_code))
+                    or (iso3_code and countries_by_iso3.get(iso3_code))
+                    or countries_by_name.get(country_name)
+                )
 
+                row = {"name": existing_country or country_name}
                 if not existing_country:
-                    existing_country_name = frappe.db.get_value("Country", {"name": country_name}, "country_name")
-                    if existing_country_name:
-                        existing_country = existing_country_name
-
-                if existing_country and not force_update:
-                    continue
-
-                # Create or update country
-                if existing_country:
-                    country_doc = frappe.get_doc("Country", existing_country)
-                else:
-                    country_doc = frappe.new_doc("Country")
-                    country_doc.country_name = country_name
-
-                # Update country fields
-                if country.get("iso2"):
-                    country_doc.code = iso2_code
-                    self.safe_set_field(country_doc, 'iso2', iso2_code)
-
-                country_doc.flags.ignore_mandatory = True
-
-                # Set geographic and basic fields
-                self.safe_set_field(country_doc, 'latitude', country.get("latitude", ""))
-                self.safe_set_field(country_doc, 'longitude', country.get("longitude", ""))
-                self.safe_set_field(country_doc, 'emoji', country.get("emoji", ""))
-                self.safe_set_field(country_doc, 'emojiU', country.get("emojiU", ""))
-
-                # Add custom fields data
-                self.safe_set_field(country_doc, 'iso3', country.get("iso3", "").strip().lower())
-                self.safe_set_field(country_doc, 'numeric_code', country.get("numeric_code", ""))
-                self.safe_set_field(country_doc, 'phonecode', country.get("phonecode", ""))
-                self.safe_set_field(country_doc, 'capital', country.get("capital", ""))
-                self.safe_set_field(country_doc, 'currency_name', country.get("currency_name", ""))
-                self.safe_set_field(country_doc, 'currency_symbol', country.get("currency_symbol", ""))
-                self.safe_set_field(country_doc, 'tld', country.get("tld", ""))
-                self.safe_set_field(country_doc, 'native', country.get("native", ""))
+                    row["country_name"] = country_name
+
+                if iso2_code:
+                    row["code"] = iso2_code
+                    row["iso2"] = iso2_code
+
+                row.update({
+                    # Geographic and basic fields
+                    "latitude": country.get("latitude", ""),
+                    "longitude": country.get("longitude", ""),
+                    "emoji": country.get("emoji", ""),
+                    "emojiU": country.get("emojiU", ""),
+                    # Custom fields data
+                    "iso3": iso3_code,
+                    "numeric_code": country.get("numeric_code", ""),
+                    "phonecode": country.get("phonecode", ""),
+                    "capital": country.get("capital", ""),
+                    "currency_name": country.get("currency_name", ""),
+                    "currency_symbol": country.get("currency_symbol", ""),
+                    "tld": country.get("tld", ""),
+                    "native": country.get("native", ""),
+                    "nationality": country.get("nationality", ""),
+                    "external_id": str(country.get("id", "")),
+                })
 
                 # Link to Region and Subregion DocTypes
-                if country.get("region"):
-                    region_name = frappe.db.get_value("Region", {"region_name": country["region"]}, "name")
-                    if region_name:
-                        self.safe_set_field(country_doc, 'region', region_name)
-
-                if country.get("subregion"):
-                    subregion_name = frappe.db.get_value("Subregion", {"subregion_name": country["subregion"]}, "name")
-                    if subregion_name:
-                        self.safe_set_field(country_doc, 'subregion', subregion_name)
-
-                self.safe_set_field(country_doc, 'nationality', country.get("nationality", ""))
-                self.safe_set_field(country_doc, 'external_id', str(country.get("id", "")))
-                self.safe_set_field(country_doc, 'last_updated', now())
-
-                country_doc.save(ignore_permissions=True)
-                imported_count += 1
-
-                if imported_count % 50 == 0:
-                    frappe.db.commit()
-                    frappe.logger().info(f"Imported {imported_count} countries...")
-
-            except Exception as e:
-                frappe.logger().error(f"Error importing country {country.get('name', 'Unknown')}: {str(e)}")
-                print(f"Error importing {country_name}: {str(e)}")
-                continue
-
-        frappe.db.commit()
+                if regions.get(country.get("region")):
+                    row["region"] = regions[country["region"]]
+                if subregions.get(country.get("subregion")):
+                    row["subregion"] = subregions[country["subregion"]]
+
+                yield row
+
+        # Country is an ERPNext doctype with its own hooks, so it is always saved as documents
+        imported_count = self.import_rows("Country", rows(), force_update, resume_from=resume_from)
+        if self.get_stats("Country").updated:
+            # Imported countries skip realign_country; their states and cities follow in one pass each
+            self.reconcile_links("State")
+            self.reconcile_links("City")
         frappe.logger().info(f"Successfully imported {imported_count} countries")
         return imported_count
 
+    @instrumented_stage("states")
     def import_states(self, force_update=False):
         """Import states data"""
         frappe.logger().info("Importing states data...")
 
+        resume_from = self.begin_stage("states")
+        if resume_from is None:
+            return 0
+
         # Download states data
-        states_data = self.download_data("states.json")
+        states_data = self.load_records("states")
         if not states_data:
             return 0
 
-        imported_count = 0
-
-        for state in states_data:
-            # try:
-            state_name = state.get("name", "").strip()
-            country_code = state.get("country_code", "").strip().lower()
+        countries_by_code = self.load_country_maps()[0]
+        # State names are document names, so a name already held by another country's
+        # state is left to that state rather than moved between countries on every run
+        owners = {name: state.country_code for name, state in load_state_parents().items() if state.country_code}
+        stats = self.get_stats("State")
 
-            if not state_name or not country_code:
-                continue
-
-            # Find country by code
-            country_name = frappe.db.get_value("Country", {"code": country_code}, "name")
-            if not country_name:
-                continue
+        def rows():
+            for state in states_data:
+                state_name = (state.get("name") or "").strip()
+                country_code = (state.get("country_code") or "").strip().lower()
 
-            # Check if state exists
-            existing_state = frappe.db.exists("State", state_name)
-
-            if existing_state and not force_update:
-                continue
-
-            # Create or update state
-            if existing_state:
-                state_doc = frappe.get_doc("State", existing_state)
-            else:
-                state_doc = frappe.new_doc("State")
-                state_doc.state_name = state_name
-
-            # Update state fields
-            self.safe_set_field(state_doc, 'state_code', state.get("iso2", ""))
-            state_doc.country = country_name
-            self.safe_set_field(state_doc, 'country_code', country_code)
-            self.safe_set_field(state_doc, 'state_type', state.get("type", ""))
-            self.safe_set_field(state_doc, 'fips_code', state.get("fips_code", ""))
-
-            # Geographic data
-            if state.get("latitude"):
-                self.safe_set_field(state_doc, 'latitude', flt(state.get("latitude")))
-            if state.get("longitude"):
-                self.safe_set_field(state_doc, 'longitude', flt(state.get("longitude")))
-
-            # System fields
-            self.safe_set_field(state_doc, 'external_id', str(state.get("id", "")))
-            self.safe_set_field(state_doc, 'last_updated', now())
-            self.safe_set_field(state_doc, 'is_active', 1)
-
-            state_doc.save(ignore_permissions=True)
-            imported_count += 1
-
-            if imported_count % 100 == 0:
-                frappe.db.commit()
-                frappe.logger().info(f"Imported {imported_count} states...")
+                if not self.in_scope(country_code):
+                    continue
 
-            # except Exception as e:
-            #     frappe.logger().error(f"Error importing state {state.get('name', 'Unknown')}: {str(e)}")
-            #     continue
+                # Find country by code
+                country_name = countries_by_code.get(country_code)
+                if not state_name:
+                    continue
+                if not country_name:
+                    stats.skipped += 1
+                    self.record_failure("State", state, f"Country {country_code or '(empty)'} not found")
+                    continue
+                if owners.get(state_name, country_code) != country_code:
+                    stats.skipped += 1
+                    self.record_failure("State", state, f"State {state_name} already exists in {owners[state_name]}")
+                    continue
 
-        frappe.db.commit()
+                yield {
+                    "name": state_name,
+                    "state_name": state_name,
+                    "state_code": state.get("iso2", ""),
+                    "country": country_name,
+                    "country_code": country_code,
+                    "state_type": state.get("type", ""),
+                    "fips_code": state.get("fips_code", ""),
+                    # Geographic data
+                    "latitude": flt(state.get("latitude")),
+                    "longitude": flt(state.get("longitude")),
+                    "geohash": get_geohash(state.get("latitude"), state.get("longitude")),
+                    # System fields
+                    "external_id": str(state.get("id", "")),
+                    "is_active": 1,
+                }
+
+        imported_count = self.import_rows("State", rows(), force_update, bulk=self.bulk, resume_from=resume_from)
+        self.reconcile_links("State")
+        self.refresh_search_index("State")
         frappe.logger().info(f"Successfully imported {imported_count} states")
         return imported_count
 
+    @instrumented_stage("cities")
     def import_cities(self, force_update=False):
         """Import cities data (with batching due to large dataset)"""
         frappe.logger().info("Importing cities data...")
 
+        resume_from = self.begin_stage("cities")
+        if resume_from is None:
+            return 0
+
         # Download cities data
-        cities_data = self.download_data("cities.json")
+        cities_data = self.load_records("cities")
         if not cities_data:
             return 0
 
-        imported_count = 0
-        batch_count = 0
+        states = self.load_state_map()
+        stats = self.get_stats("City")
 
-        # Process in batches
-        for i in range(0, len(cities_data), self.batch_size):
-            batch = cities_data[i:i + self.batch_size]
-            batch_count += 1
+        def rows():
+            for city in cities_data:
+                country_code = (city.get("country_code") or "").strip().lower()
+                if not self.in_scope(country_code):
+                    continue
 
-            for city in batch:
-                try:
-                    city_name = city.get("name", "").strip()
-                    state_name = city.get("state_name", "").strip()
-                    country_code = city.get("country_code", "").strip().lower()
-
-                    if not city_name or not state_name or not country_code:
-                        continue
-
-                    # Find state
-                    existing_state = frappe.db.exists("State", state_name)
-                    if not existing_state:
-                        continue
-
-                    # Create unique city identifier
-                    city_identifier = f"{city_name}-{state_name}"
-
-                    # Check if city exists
-                    existing_city = frappe.db.exists("City", {"name": city_identifier})
-
-                    if existing_city and not force_update:
-                        continue
-
-                    # Create or update city
-                    if existing_city:
-                        city_doc = frappe.get_doc("City", existing_city)
-                    else:
-                        city_doc = frappe.new_doc("City")
-                        city_doc.city_name = city_name
-                        city_doc.state = state_name
-                        # Explicitly set the name to match the autoname format
-                        city_doc.name = city_identifier
-
-                    # Get country from state
-                    state_doc = frappe.get_doc("State", state_name)
-                    city_doc.country = state_doc.country
-                    self.safe_set_field(city_doc, 'country_code', state_doc.country_code)
-                    self.safe_set_field(city_doc, 'state_code', state_doc.state_code)
+                city_name = (city.get("name") or "").strip()
+                state_name = (city.get("state_name") or "").strip()
 
-                    # Geographic data
-                    if city.get("latitude"):
-                        self.safe_set_field(city_doc, 'latitude', flt(city.get("latitude")))
-                    if city.get("longitude"):
-                        self.safe_set_field(city_doc, 'longitude', flt(city.get("longitude")))
+                # Find the state within the city's own country, the key the shard scope uses
+                state = states.get((country_code, state_name))
+                if not city_name:
+                    continue
+                if not state:
+                    stats.skipped += 1
+                    self.record_failure("City", city, f"State {state_name or '(empty)'} not found in {country_code or '(empty)'}")
+                    continue
 
+                yield {
+                    # Unique city identifier, matching the autoname format
+                    "name": f"{city_name}-{state_name}",
+                    "city_name": city_name,
+                    "state": state_name,
+                    # Country and codes come from the state
+                    "state_code": state.state_code,
+                    "country": state.country,
+                    "country_code": country_code,
+                    # Geographic data
+                    "latitude": flt(city.get("latitude")),
+                    "longitude": flt(city.get("longitude")),
+                    "geohash": get_geohash(city.get("latitude"), city.get("longitude")),
                     # Reference data
-                    self.safe_set_field(city_doc, 'wikidata_id', city.get("wikiDataId", ""))
-                    self.safe_set_field(city_doc, 'external_id', str(city.get("id", "")))
-                    self.safe_set_field(city_doc, 'last_updated', now())
-                    self.safe_set_field(city_doc, 'is_active', 1)
+                    "wikidata_id": city.get("wikiDataId", ""),
+                    "external_id": str(city.get("id", "")),
+                    "is_active": 1,
+                }
+
+        imported_count = self.import_rows("City", rows(), force_update, bulk=self.bulk, resume_from=resume_from)
+        self.reconcile_links("City")
+        self.refresh_search_index("City")
+        frappe.logger().info(f"Successfully imported {imported_count} cities")
+        return imported_count
 
-                    city_doc.save(ignore_permissions=True)
-                    imported_count += 1
+    def prefetch(self, datasets):
+        """Start downloading the files of `datasets` in parallel with the DB stages"""
+        self.source.prefetch(self.data_format.get_filename(dataset) for dataset in datasets)
 
-                except Exception as e:
-                    frappe.logger().error(f"Error importing city {city.get('name', 'Unknown')}: {str(e)}")
-                    continue
+    def download_data(self, dataset):
+        """Load all records of a dataset from the configured source.
 
-            # Commit after each batch
-            frappe.db.commit()
-            frappe.logger().info(f"Processed batch {batch_count}, imported {imported_count} cities so far...")
+        A failed download of countries, states or cities raises, so the run stops
+        and can be resumed from its checkpoint. The optional region levels are
+        skipped and logged instead.
+        """
+        try:
+            frappe.logger().info(f"Loading {dataset} ({self.data_format.name}) from {self.source.describe()}...")
+            data = self.data_format.load(self.source, dataset)
 
-        frappe.logger().info(f"Successfully imported {imported_count} cities")
-        return imported_count
+        except Exception as e:
+            if dataset in OPTIONAL_STAGES:
+                frappe.logger().warning(f"Skipping {dataset}, failed to download: {e}")
+                self.record_failure(STAGE_DOCTYPES[dataset], {"name": self.data_format.get_filename(dataset)}, f"Download failed: {e}")
+                return []
+            frappe.logger().error(f"Failed to download {dataset}: {str(e)}")
+            raise
 
-    def download_data(self, filename):
-        """Download data from GitHub repository"""
-        url = f"{self.base_url}/{filename}"
+        frappe.logger().info(f"Loaded {len(data)} records from {dataset}")
+        self.add_stage_metric("rows_read", len(data))
+        return data
 
-        try:
-            frappe.logger().info(f"Downloading {filename} from GitHub...")
-            response = requests.get(url, timeout=300)
-            response.raise_for_status()
+    def load_records(self, dataset):
+        """Return the records of a dataset, as a generator in streaming mode"""
+        if self.streaming:
+            return self.stream_data(dataset)
+        return self.download_data(dataset)
 
-            data = response.json()
-            frappe.logger().info(f"Downloaded {len(data)} records from {filename}")
-            return data
+    def stream_data(self, dataset):
+        """Read a dataset incrementally, yielding one record at a time"""
+        record_count = 0
+
+        try:
+            frappe.logger().info(f"Streaming {dataset} ({self.data_format.name}) from {self.source.describe()}...")
+            for record in self.data_format.iter_records(self.source, dataset, self.stream_chunk_size):
+                record_count += 1
+                yield record
 
         except Exception as e:
-            frappe.logger().error(f"Failed to download {filename}: {str(e)}")
-            return None
+            frappe.logger().error(f"Failed to stream {dataset} after {record_count} records: {str(e)}")
+            raise
+
+        finally:
+            self.add_stage_metric("rows_read", record_count)
+
+        frappe.logger().info(f"Streamed {record_count} records from {dataset}")
 
     def log_import_completion(self, regions, subregions, countries, states, cities):
         """Log import completion in system"""
         frappe.logger().info(f"Location data import completed - Regions: {regions}, Subregions: {subregions}, Countries: {countries}, States: {states}, Cities: {cities}")
-
-
-def refresh_location_data(force_update=False):
-    """Refresh all location data - called by scheduled job"""
-    importer = LocationDataImporter()
+        for doctype, stats in self.stats.items():
+            frappe.logger().info(
+                f"{doctype}: {stats.inserted} inserted, {stats.updated} updated, {stats.unchanged} unchanged, "
+                f"{stats.skipped} skipped, {stats.failed} failed, {stats.removed} removed upstream, "
+                f"{stats.reactivated} reactivated, {stats.deleted} deleted, {stats.realigned} realigned, {stats.orphaned} orphaned"
+            )
+
+
+def refresh_location_data(force_update=False, bulk=False, streaming=False, source=None, incremental=False, run_id=None, data_format=None, delete_removed=False, dry_run=False, full_snapshot=False):
+    """Refresh all location data - called by scheduled job
+
+    Passing a run_id makes the run resumable: progress is checkpointed after every
+    batch and calling again with the same run_id continues where it stopped.
+    With dry_run nothing is written; the result holds a per-doctype diff of the
+    inserts, updates (with changed fields), deactivations and unresolved parents
+    the run would produce.
+    Rows missing upstream are only deactivated when full_snapshot says the source
+    holds the complete dataset; a dry run reports them as if it did.
+    """
+    importer = LocationDataImporter(
+        bulk=bulk, streaming=streaming, source=source, incremental=incremental, data_format=data_format,
+        delete_removed=delete_removed, dry_run=dry_run, full_snapshot=full_snapshot,
+    )
+    if run_id and not dry_run:
+        importer.start_checkpoint(run_id, {
+            "force_update": force_update,
+            "bulk": bulk,
+            "streaming": streaming,
+            "source": source,
+            "incremental": incremental,
+            "data_format": data_format,
+            "delete_removed": delete_removed,
+            "full_snapshot": full_snapshot,
+        })
     return importer.import_all_data(force_update)
 
 
-def refresh_location_data_chunked(force_update=False, chunk_size=50):
+def refresh_location_data_chunked(force_update=False, chunk_size=50, bulk=False, streaming=False, source=None, incremental=False, run_id=None, data_format=None, delete_removed=False, full_snapshot=False):
     """Refresh location data in smaller chunks with progress updates"""
     frappe.logger().info("Starting chunked location data import...")
 
     try:
-        importer = LocationDataImporter()
+        importer = LocationDataImporter(
+            bulk=bulk, streaming=streaming, source=source, incremental=incremental, data_format=data_format,
+            delete_removed=delete_removed, full_snapshot=full_snapshot,
+        )
+        if run_id:
+            importer.start_checkpoint(run_id, {
+                "force_update": force_update,
+                "chunk_size": chunk_size,
+                "bulk": bulk,
+                "streaming": streaming,
+                "source": source,
+                "incremental": incremental,
+                "data_format": data_format,
+                "delete_removed": delete_removed,
+                "full_snapshot": full_snapshot,
+            })
 
         # Set smaller batch size for better progress tracking
         original_batch_size = importer.batch_size
@@ -0,0 +1,69 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+import frappe
+
+
+def quote_column(column):
+    """Quote an identifier for the current database"""
+    if frappe.db.db_type == "postgres":
+        return f'"{column}"'
+    return f"`{column}`"
+
+
+def upsert(doctype, fields, values, update_fields, key="name", chunk_size=1000):
+    """Insert rows, updating `update_fields` of rows whose `key` already exists.
+
+    Uses INSERT ... ON DUPLICATE KEY UPDATE on MariaDB and INSERT ... ON CONFLICT
+    DO UPDATE on Postgres, one statement per `chunk_size` rows.
+    """
+    if not values:
+        return
+
+    table = quote_column(f"tab{doctype}")
+    columns = ", ".join(quote_column(field) for field in fields)
+    row_placeholder = "({})".format(", ".join(["%s"] * len(fields)))
+
+    if frappe.db.db_type == "postgres":
+        assignments = ", ".join(f"{quote_column(field)} = EXCLUDED.{quote_column(field)}" for field in update_fields)
+        conflict_clause = f"ON CONFLICT ({quote_column(key)}) DO UPDATE SET {assignments}"
+    else:
+        assignments = ", ".join(f"{quote_column(field)} = VALUES({quote_column(field)})" for field in update_fields)
+        conflict_clause = f"ON DUPLICATE KEY UPDATE {assignments}"
+
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        frappe.db.sql(
+            f"INSERT INTO {table} ({columns}) VALUES {', '.join([row_placeholder] * len(chunk))} {conflict_clause}",
+            [value for row in chunk for value in row],
+        )
+
+
+def is_distinct(left, right):
+    """NULL-safe inequality of two SQL expressions"""
+    if frappe.db.db_type == "postgres":
+        return f"{left} IS DISTINCT FROM {right}"
+    return f"NOT ({left} <=> {right})"
+
+
+def update_from(doctype, alias, source_doctype, source_alias, on, assignments, where="1=1", values=None):
+    """Set columns of `doctype` from a joined `source_doctype` in one statement.
+
+    `assignments` maps target columns to expressions over the aliases. Uses
+    UPDATE ... JOIN on MariaDB and UPDATE ... FROM on Postgres.
+    """
+    table = quote_column(f"tab{doctype}")
+    source_table = quote_column(f"tab{source_doctype}")
+
+    if frappe.db.db_type == "postgres":
+        set_clause = ", ".join(f"{quote_column(column)} = {expression}" for column, expression in assignments.items())
+        frappe.db.sql(
+            f"UPDATE {table} AS {alias} SET {set_clause} FROM {source_table} AS {source_alias} WHERE {on} AND ({where})",
+            values,
+        )
+    else:
+        set_clause = ", ".join(f"{alias}.{quote_column(column)} = {expression}" for column, expression in assignments.items())
+        frappe.db.sql(
+            f"UPDATE {table} {alias} JOIN {source_table} {source_alias} ON {on} SET {set_clause} WHERE {where}",
+            values,
+        )
@@ -0,0 +1,215 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+import codecs
+import csv
+import gzip
+import io
+import json
+import resource
+import sqlite3
+from contextlib import contextmanager
+from typing import ClassVar
+
+import frappe
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+# Characters that can follow a complete scalar item
+_SCALAR_ENDS = frozenset(_WHITESPACE + ",]")
+# Largest upstream records are countries with their translations, a few KB each
+MAX_ITEM_SIZE = 1024 * 1024
+
+
+def iter_json_array(chunks, max_item_size=MAX_ITEM_SIZE):
+    """Yield the items of a top-level JSON array from an iterable of byte chunks.
+
+    Only the current chunk and the item being decoded are held in memory, so a
+    file of any size can be parsed with a bounded footprint. Malformed input
+    raises ValueError once more than `max_item_size` characters fail to decode,
+    instead of buffering the rest of the file.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + text_decoder.decode(chunk)
+        position = 0
+
+        while True:
+            # Skip whitespace, the opening bracket and item separators
+            while position < len(buffer) and (buffer[position] in _WHITESPACE or buffer[position] == ","):
+                position += 1
+            if position >= len(buffer):
+                break
+
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                item, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item continues in the next chunk
+                break
+
+            if not isinstance(item, dict | list) and buffer[end:end + 1] not in _SCALAR_ENDS:
+                # A number cut by the chunk may still be incomplete, like "7500." of "7500.0"
+                break
+
+            yield item
+            position = end
+
+        if len(buffer) - position > max_item_size:
+            raise ValueError(f"No complete JSON array item within {max_item_size} characters: {buffer[position:position + 80]!r}")
+
+    raise ValueError("Unexpected end of JSON array")
+
+
+class JsonFormat:
+    """Uncompressed JSON arrays, one file per dataset"""
+
+    name = "json"
+    directory = "json"
+    filenames: ClassVar[dict[str, str]] = {
+        "regions": "regions.json",
+        "subregions": "subregions.json",
+        "countries": "countries.json",
+        "states": "states.json",
+        "cities": "cities.json",
+    }
+
+    def get_filename(self, dataset):
+        return self.filenames[dataset]
+
+    def open(self, source, dataset):
+        return source.open(self.get_filename(dataset))
+
+    def load(self, source, dataset):
+        """Return all records of a dataset as a list"""
+        with self.open(source, dataset) as f:
+            return json.load(f)
+
+    def iter_records(self, source, dataset, chunk_size=64 * 1024):
+        """Yield the records of a dataset one at a time"""
+        with self.open(source, dataset) as f:
+            yield from iter_json_array(iter(lambda: f.read(chunk_size), b""))
+
+
+class GzipJsonFormat(JsonFormat):
+    """Gzip-compressed JSON arrays, decompressed on the fly"""
+
+    name = "json.gz"
+    filenames: ClassVar[dict[str, str]] = {dataset: f"{filename}.gz" for dataset, filename in JsonFormat.filenames.items()}
+
+    @contextmanager
+    def open(self, source, dataset):
+        with source.open(self.get_filename(dataset)) as raw, gzip.GzipFile(fileobj=raw, mode="rb") as f:
+            yield f
+
+
+class CsvFormat:
+    """CSV exports, read row by row"""
+
+    name = "csv"
+    directory = "csv"
+    filenames: ClassVar[dict[str, str]] = {
+        "regions": "regions.csv",
+        "subregions": "subregions.csv",
+        "countries": "countries.csv",
+        "states": "states.csv",
+        "cities": "cities.csv",
+    }
+    # Columns that are numbers in the JSON export
+    integer_columns = ("id", "region_id", "subregion_id", "country_id", "state_id")
+
+    def get_filename(self, dataset):
+        return self.filenames[dataset]
+
+    def load(self, source, dataset):
+        return list(self.iter_records(source, dataset))
+
+    def iter_records(self, source, dataset, chunk_size=64 * 1024):
+        with source.open(self.get_filename(dataset)) as f:
+            reader = csv.DictReader(io.TextIOWrapper(f, encoding="utf-8", newline=""))
+            for row in reader:
+                yield normalize_record(row, self.integer_columns)
+
+
+class SqliteFormat:
+    """The SQLite export: one database file, queried with a cursor per dataset"""
+
+    name = "sqlite"
+    directory = "sqlite"
+    filename = "world.sqlite3"
+    queries: ClassVar[dict[str, str]] = {
+        "regions": "select * from regions order by id",
+        "subregions": "select * from subregions order by id",
+        "countries": "select * from countries order by id",
+        "states": "select * from states order by id",
+        # The cities table has no state name, which the importer keys cities on
+        "cities": (
+            "select cities.*, states.name as state_name from cities "
+            "left join states on states.id = cities.state_id order by cities.id"
+        ),
+    }
+
+    def get_filename(self, dataset):
+        return self.filename
+
+    def load(self, source, dataset):
+        return list(self.iter_records(source, dataset))
+
+    def iter_records(self, source, dataset, chunk_size=64 * 1024):
+        path = source.get_local_path(self.filename)
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        try:
+            cursor = connection.execute(self.queries[dataset])
+            for row in cursor:
+                yield normalize_record(dict(row))
+        finally:
+            connection.close()
+
+
+FORMATS = {data_format.name: data_format for data_format in (JsonFormat, GzipJsonFormat, CsvFormat, SqliteFormat)}
+
+# Column names that differ between export versions, mapped to the JSON names the importer reads
+COLUMN_ALIASES = {"phone_code": "phonecode"}
+
+
+def normalize_record(record, integer_columns=()):
+    """Give CSV and SQLite rows the same shape as JSON records"""
+    normalized = {}
+    for key, value in record.items():
+        if value == "":
+            value = None
+        elif key in integer_columns and value is not None:
+            value = int(value)
+        normalized[COLUMN_ALIASES.get(key, key)] = value
+    return normalized
+
+
+def get_format(data_format=None):
+    """Return the format adapter for a name such as "json", "json.gz", "csv" or "sqlite"."""
+    if not isinstance(data_format, str) and data_format is not None:
+        return data_format
+
+    data_format = data_format or frappe.conf.get("location_data_format") or "json"
+    if data_format not in FORMATS:
+        frappe.throw(f"Unsupported location data format {data_format}. Use one of: {', '.join(FORMATS)}")
+    return FORMATS[data_format]()
+
+
+def get_peak_memory_mb():
+    """Peak resident set size of the current process in MB"""
+    # ru_maxrss is reported in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
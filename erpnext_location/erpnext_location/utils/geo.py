@@ -0,0 +1,343 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Nearest-city lookups over an in-process KD-tree.
+
+Active cities are loaded once per worker process and site and indexed as points on the
+unit sphere, where straight-line distance orders points the same way as distance
+along the surface and needs no special case at the antimeridian or the poles.
+The tree is rebuilt on the next lookup after the city index generation changes,
+which only imports and edits of the indexed City fields bump.
+
+Radius and box queries go to the database instead: City and State store an
+indexed geohash, so a box is first narrowed to a few geohash prefixes in SQL and
+the exact distance is only computed for the rows that come back.
+"""
+
+import heapq
+import math
+
+import frappe
+from frappe.utils import flt
+
+from erpnext_location.erpnext_location.utils.cache import bump_generation, get_generation
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+# 7 characters is a cell of about 150 m by 150 m at the equator
+GEOHASH_PRECISION = 7
+# Most LIKE prefixes a box query sends before falling back to coarser cells
+MAX_PREFIXES = 16
+
+# {site: CityIndex}; a worker process may serve several sites
+_indexes = {}
+CITY_INDEX_KEY = "location_city_index_generation"
+# City fields the index holds; edits to other fields keep it
+CITY_INDEX_FIELDS = ("city_name", "state", "country", "latitude", "longitude", "is_active")
+
+
+def to_point(lat, lon):
+    """Unit vector of a latitude/longitude in degrees"""
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def chord_to_km(chord):
+    """Surface distance of a straight-line distance between two unit vectors"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(math.sqrt(a), 1.0))
+
+
+def get_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    """Geohash of a point, or None for the 0, 0 the importer stores when coordinates are missing"""
+    lat, lon = flt(lat), flt(lon)
+    if not lat and not lon:
+        return None
+    return encode_geohash(lat, lon, precision)
+
+
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, even = [], 0, 0, True
+    while len(geohash) < precision:
+        # Bits alternate between longitude and latitude, starting with longitude
+        value, bounds = (lon, lon_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            bounds[0] = middle
+        else:
+            bits *= 2
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(geohash)
+
+
+def get_cell_size(precision):
+    """(height, width) in degrees of a geohash cell"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2**lat_bits, 360.0 / 2**lon_bits
+
+
+def get_steps(start, end, step):
+    """Points from start to end, at most `step` apart, so every cell of that size is hit"""
+    value = start
+    while value < end:
+        yield value
+        value += step
+    yield end
+
+
+def get_covering_prefixes(south, west, north, east, max_prefixes=MAX_PREFIXES):
+    """The longest geohash prefixes, at most max_prefixes of them, whose cells cover a box.
+
+    Returns None when even single-character cells would be too many, and the box
+    is better scanned on latitude and longitude alone.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = get_cell_size(precision)
+        if ((north - south) / height + 2) * ((east - west) / width + 2) > max_prefixes:
+            continue
+        prefixes = {
+            encode_geohash(lat, lon, precision)
+            for lat in get_steps(south, north, height)
+            for lon in get_steps(west, east, width)
+        }
+        if len(prefixes) <= max_prefixes:
+            return sorted(prefixes)
+    return None
+
+
+def split_antimeridian(south, west, north, east):
+    """A box as one or two boxes that do not cross the antimeridian"""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def get_radius_box(lat, lon, radius_km):
+    """Boxes enclosing every point within radius_km of a point"""
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+    if south == -90.0 or north == 90.0:
+        # The circle reaches a pole and so spans every longitude
+        return [(south, -180.0, north, 180.0)]
+
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    if ratio >= 1.0:
+        return [(south, -180.0, north, 180.0)]
+
+    delta_lon = math.degrees(math.asin(ratio))
+    west, east = lon - delta_lon, lon + delta_lon
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return split_antimeridian(south, west, north, east)
+
+
+def get_cities_in_boxes(boxes, fields=("name", "city_name", "state", "country", "latitude", "longitude")):
+    """Active cities inside any of the boxes, pruned by geohash prefix before the coordinate check"""
+    cities = []
+    for south, west, north, east in boxes:
+        or_filters = None
+        prefixes = get_covering_prefixes(south, west, north, east)
+        if prefixes:
+            or_filters = [["geohash", "like", f"{prefix}%"] for prefix in prefixes]
+        cities += frappe.get_all(
+            "City",
+            filters=[
+                ["is_active", "=", 1],
+                ["geohash", "is", "set"],
+                ["latitude", ">=", south],
+                ["latitude", "<=", north],
+                ["longitude", ">=", west],
+                ["longitude", "<=", east],
+            ],
+            or_filters=or_filters,
+            fields=list(fields),
+        )
+    return cities
+
+
+def cities_within(lat, lon, radius_km, limit=None):
+    """Active cities within radius_km of a point, closest first, with their distance in km"""
+    lat, lon = validate_coordinates(lat, lon)
+    radius_km = flt(radius_km)
+    if radius_km <= 0:
+        frappe.throw("Radius must be greater than 0")
+
+    cities = get_cities_in_boxes(get_radius_box(lat, lon, radius_km))
+    for city in cities:
+        city.distance_km = round(haversine_km(lat, lon, city.latitude, city.longitude), 3)
+    cities = sorted((city for city in cities if city.distance_km <= radius_km), key=lambda city: city.distance_km)
+    return cities[:limit] if limit else cities
+
+
+def cities_in_bbox(south, west, north, east, limit=None):
+    """Active cities inside a box; west > east is a box across the antimeridian"""
+    south, west = validate_coordinates(south, west)
+    north, east = validate_coordinates(north, east)
+    if south > north:
+        frappe.throw("South must not be greater than north")
+
+    cities = sorted(get_cities_in_boxes(split_antimeridian(south, west, north, east)), key=lambda city: city.name)
+    return cities[:limit] if limit else cities
+
+
+def backfill_geohash(doctype, batch_size=5000):
+    """Set the geohash of every row of City or State from its coordinates"""
+    updated = 0
+    last_name = ""
+    while True:
+        rows = frappe.get_all(
+            doctype,
+            filters={"name": [">", last_name]},
+            fields=["name", "latitude", "longitude", "geohash"],
+            order_by="name asc",
+            limit_page_length=batch_size,
+        )
+        if not rows:
+            break
+        last_name = rows[-1].name
+
+        updates = {}
+        for row in rows:
+            geohash = get_geohash(row.latitude, row.longitude)
+            if geohash != (row.geohash or None):
+                updates[row.name] = {"geohash": geohash}
+        if updates:
+            frappe.db.bulk_update(doctype, updates, chunk_size=500, update_modified=False)
+            frappe.db.commit()
+            updated += len(updates)
+
+    frappe.logger().info(f"Set geohash on {updated} {doctype} rows")
+    return updated
+
+
+def validate_coordinates(lat, lon):
+    lat, lon = flt(lat), flt(lon)
+    if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+        frappe.throw(f"Invalid coordinates {lat}, {lon}")
+    return lat, lon
+
+
+class KDTree:
+    """Static 3-d tree over a list of points, stored as flat arrays"""
+
+    def __init__(self, points):
+        self.points = points
+        # Node i holds point order[i]; its children are the halves on either side of it
+        self.order = list(range(len(points)))
+        self.axes = [0] * len(points)
+        self.build(0, len(points), 0)
+
+    def build(self, start, end, depth):
+        # Iterative to keep deep trees clear of the recursion limit
+        stack = [(start, end, depth)]
+        while stack:
+            start, end, depth = stack.pop()
+            if end - start <= 0:
+                continue
+            axis = depth % 3
+            segment = sorted(self.order[start:end], key=lambda i: self.points[i][axis])
+            self.order[start:end] = segment
+            middle = (start + end) // 2
+            self.axes[middle] = axis
+            stack.append((start, middle, depth + 1))
+            stack.append((middle + 1, end, depth + 1))
+
+    def nearest(self, point, k=1):
+        """[(squared distance, point index)] of the k nearest points, closest first"""
+        heap = []  # max-heap of the best k as (-distance, index)
+        stack = [(0, len(self.order))]
+        while stack:
+            start, end = stack.pop()
+            if end - start <= 0:
+                continue
+            middle = (start + end) // 2
+            index = self.order[middle]
+            candidate = self.points[index]
+            distance = (
+                (candidate[0] - point[0]) ** 2 + (candidate[1] - point[1]) ** 2 + (candidate[2] - point[2]) ** 2
+            )
+            if len(heap) < k:
+                heapq.heappush(heap, (-distance, index))
+            elif distance < -heap[0][0]:
+                heapq.heapreplace(heap, (-distance, index))
+
+            offset = point[self.axes[middle]] - candidate[self.axes[middle]]
+            near, far = ((start, middle), (middle + 1, end)) if offset < 0 else ((middle + 1, end), (start, middle))
+            # The far half can only hold a closer point if the splitting plane is within reach
+            if len(heap) < k or offset * offset < -heap[0][0]:
+                stack.append(far)
+            stack.append(near)
+
+        return sorted((-distance, index) for distance, index in heap)
+
+
+class CityIndex:
+    def __init__(self, generation):
+        self.generation = generation
+        self.cities = frappe.get_all(
+            "City",
+            filters={"is_active": 1},
+            fields=["name", "city_name", "state", "country", "latitude", "longitude"],
+        )
+        # 0, 0 is what the importer stores for a missing coordinate
+        self.cities = [city for city in self.cities if city.latitude or city.longitude]
+        self.tree = KDTree([to_point(flt(city.latitude), flt(city.longitude)) for city in self.cities])
+
+    def nearest(self, lat, lon, k=1, max_distance_km=None):
+        results = []
+        for distance, index in self.tree.nearest(to_point(lat, lon), k):
+            distance_km = chord_to_km(math.sqrt(distance))
+            if max_distance_km is not None and distance_km > max_distance_km:
+                break
+            city = self.cities[index]
+            results.append(
+                frappe._dict(
+                    city=city.name,
+                    city_name=city.city_name,
+                    state=city.state,
+                    country=city.country,
+                    distance_km=round(distance_km, 3),
+                )
+            )
+        return results
+
+
+def get_city_index():
+    """The process-wide index, rebuilt when the city index generation has moved on"""
+    generation = get_generation(CITY_INDEX_KEY)
+    index = _indexes.get(frappe.local.site)
+    if index is None or index.generation != generation:
+        index = _indexes[frappe.local.site] = CityIndex(generation)
+    return index
+
+
+def invalidate_city_index(doc=None):
+    """Rebuild the index in every worker once a change to the indexed cities commits.
+
+    For a saved City only changes to CITY_INDEX_FIELDS count.
+    """
+    if doc is not None and doc.doctype == "City" and not any(doc.has_value_changed(field) for field in CITY_INDEX_FIELDS):
+        return
+    bump_generation(doc, key=CITY_INDEX_KEY)
+
+
+def nearest_cities(lat, lon, k=1, max_distance_km=None):
+    """The k active cities closest to a point, with their distance in km"""
+    lat, lon = validate_coordinates(lat, lon)
+    return get_city_index().nearest(lat, lon, k, max_distance_km)
@@ -0,0 +1,318 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Country-sharded location import.
+
+The coordinator imports the small levels (regions, subregions, countries) itself,
+splits the state and city stages into shards of whole countries balanced by city
+count, and enqueues one long-queue job per shard so they run on all available
+workers at once. Each shard records its counts in Redis; the last shard to finish
+enqueues the aggregation step. Failed shards can be retried on their own.
+"""
+
+import traceback
+
+import frappe
+
+from erpnext_location.erpnext_location.utils.bundles import build_bundles
+from erpnext_location.erpnext_location.utils.counters import recompute_counters
+from erpnext_location.erpnext_location.utils.data_import import STAGES, LocationDataImporter
+
+RUN_TTL = 7 * 24 * 60 * 60
+MODULE = "erpnext_location.erpnext_location.utils.import_coordinator"
+
+
+def get_run_key(run_id):
+    return f"location_import_run:{run_id}"
+
+
+def get_results_key(run_id):
+    return f"location_import_shards:{run_id}"
+
+
+def get_run(run_id):
+    run = frappe.cache.get_value(get_run_key(run_id))
+    if not run:
+        frappe.throw(f"Location import run {run_id} not found or expired")
+    return run
+
+
+def enqueue_sharded_import(force_update=False, shards=8, bulk=True, streaming=True, source=None, incremental=False, data_format=None, delete_removed=False, full_snapshot=False):
+    """Queue the coordinator job of a sharded import"""
+    run_id = frappe.generate_hash(length=10)
+    frappe.enqueue(
+        method=f"{MODULE}.run_sharded_import",
+        queue="long",
+        timeout=3600,
+        job_name=f"location_data_import:{run_id}",
+        run_id=run_id,
+        force_update=force_update,
+        shards=shards,
+        bulk=bulk,
+        streaming=streaming,
+        source=source,
+        incremental=incremental,
+        data_format=data_format,
+        delete_removed=delete_removed,
+        full_snapshot=full_snapshot,
+    )
+    return run_id
+
+
+def run_sharded_import(run_id=None, force_update=False, shards=8, bulk=True, streaming=True, source=None, incremental=False, data_format=None, delete_removed=False, full_snapshot=False):
+    """Import the top levels, then fan the state and city stages out by country"""
+    run_id = run_id or frappe.generate_hash(length=10)
+    options = {
+        "force_update": force_update,
+        "bulk": bulk,
+        "streaming": streaming,
+        "source": source,
+        "incremental": incremental,
+        "data_format": data_format,
+        "delete_removed": delete_removed,
+        "full_snapshot": full_snapshot,
+    }
+
+    importer = LocationDataImporter(
+        bulk=bulk, streaming=streaming, source=source, incremental=incremental, data_format=data_format,
+        delete_removed=delete_removed, full_snapshot=full_snapshot,
+    )
+    importer.start_checkpoint(run_id, {**options, "shards": shards})
+    importer.start_import_log(run_id)
+    # States and cities are read here too, to plan the shards
+    importer.prefetch(STAGES)
+    try:
+        top_level = {
+            "regions": importer.import_regions(force_update),
+            "subregions": importer.import_subregions(force_update),
+            "countries": importer.import_countries(force_update),
+        }
+        shard_countries = plan_shards(importer, shards)
+    except Exception:
+        frappe.db.rollback()
+        importer.finish_checkpoint("Failed", traceback.format_exc())
+        importer.save_import_log("Failed", traceback.format_exc())
+        raise
+
+    frappe.cache.set_value(
+        get_run_key(run_id),
+        {
+            "run_id": run_id,
+            "options": options,
+            "shards": shard_countries,
+            "top_level": top_level,
+            "stats": importer.stats,
+        },
+        expires_in_sec=RUN_TTL,
+    )
+    frappe.cache.delete_value(get_results_key(run_id))
+
+    importer.finish_checkpoint("Completed")
+    importer.save_import_log("Completed")
+
+    for shard_no in range(len(shard_countries)):
+        enqueue_shard(run_id, shard_no)
+
+    frappe.logger().info(f"Location import {run_id}: enqueued {len(shard_countries)} shards")
+    return run_id
+
+
+def plan_shards(importer, shards):
+    """Group country codes into at most `shards` buckets with similar city counts.
+
+    Countries with a state name in common (Punjab in IN and PK) share the State
+    document of that name, so they are kept in the same bucket.
+    """
+    weights = {}
+    for city in importer.load_records("cities") or []:
+        country_code = (city.get("country_code") or "").strip().lower()
+        weights[country_code] = weights.get(country_code, 0) + 1
+
+    # Countries that only have states still need a shard
+    groups = {}
+    state_countries = {}
+    for state in importer.load_records("states") or []:
+        country_code = (state.get("country_code") or "").strip().lower()
+        weights.setdefault(country_code, 1)
+        state_countries.setdefault((state.get("name") or "").strip(), set()).add(country_code)
+    weights.pop("", None)
+
+    for country_code in weights:
+        groups[country_code] = {country_code}
+    state_countries.pop("", None)
+    for country_codes in state_countries.values():
+        merged = set().union(*(groups.get(country_code, set()) for country_code in country_codes))
+        for country_code in merged:
+            groups[country_code] = merged
+
+    units = {id(group): sorted(group) for group in groups.values()}.values()
+    buckets = [{"weight": 0, "countries": []} for _ in range(max(1, min(shards, len(units))))]
+    for unit in sorted(units, key=lambda unit: sum(weights[country_code] for country_code in unit), reverse=True):
+        bucket = min(buckets, key=lambda bucket: bucket["weight"])
+        bucket["weight"] += sum(weights[country_code] for country_code in unit)
+        bucket["countries"].extend(unit)
+
+    return [bucket["countries"] for bucket in buckets if bucket["countries"]]
+
+
+def enqueue_shard(run_id, shard_no):
+    frappe.enqueue(
+        method=f"{MODULE}.import_shard",
+        queue="long",
+        timeout=3600,
+        job_id=f"location_import:{run_id}:{shard_no}",
+        deduplicate=True,
+        run_id=run_id,
+        shard_no=shard_no,
+    )
+
+
+def import_shard(run_id, shard_no):
+    """Import the states and cities of one shard of countries"""
+    run = get_run(run_id)
+    options = run["options"]
+    country_codes = run["shards"][shard_no]
+
+    importer = LocationDataImporter(
+        bulk=options["bulk"],
+        streaming=options["streaming"],
+        source=options["source"],
+        incremental=options["incremental"],
+        data_format=options.get("data_format"),
+        delete_removed=options.get("delete_removed", False),
+        full_snapshot=options.get("full_snapshot", False),
+    )
+    importer.country_codes = set(country_codes)
+    # Each shard resumes from its own checkpoint when retried
+    importer.start_checkpoint(f"{run_id}-{shard_no}", {"shard_of": run_id, "shard_no": shard_no})
+    importer.start_import_log(f"{run_id}-{shard_no}")
+    importer.prefetch(("states", "cities"))
+
+    result = {"shard_no": shard_no, "countries": country_codes}
+    try:
+        result["states"] = importer.import_states(options["force_update"])
+        result["cities"] = importer.import_cities(options["force_update"])
+        result["status"] = "success"
+        importer.finish_checkpoint("Completed")
+        importer.save_import_log("Completed")
+    except Exception:
+        frappe.db.rollback()
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+        importer.finish_checkpoint("Failed", result["error"])
+        importer.save_import_log("Failed", result["error"])
+        raise
+    finally:
+        result["stats"] = importer.stats
+        record_shard_result(run_id, shard_no, result)
+
+    return result
+
+
+def record_shard_result(run_id, shard_no, result):
+    """Store a shard's outcome and trigger aggregation once every shard reported"""
+    key = get_results_key(run_id)
+    frappe.cache.hset(key, str(shard_no), result)
+    frappe.cache.expire(frappe.cache.make_key(key), RUN_TTL)
+
+    if len(frappe.cache.hkeys(key)) >= len(get_run(run_id)["shards"]):
+        frappe.enqueue(
+            method=f"{MODULE}.finalize_sharded_import",
+            queue="long",
+            job_id=f"location_import_finalize:{run_id}",
+            deduplicate=True,
+            run_id=run_id,
+        )
+
+
+def get_shard_results(run_id):
+    return {int(shard_no): result for shard_no, result in frappe.cache.hgetall(get_results_key(run_id)).items()}
+
+
+def finalize_sharded_import(run_id):
+    """Aggregate per-shard counts and failures into one summary"""
+    run = get_run(run_id)
+    results = get_shard_results(run_id)
+
+    # Shards write rows without hooks; count them once for the whole run
+    recompute_counters()
+    frappe.db.commit()
+    build_bundles()
+
+    summary = {
+        "run_id": run_id,
+        "status": "success",
+        **run["top_level"],
+        "states": 0,
+        "cities": 0,
+        "stats": {doctype: dict(stats) for doctype, stats in run["stats"].items()},
+        "failed_shards": [],
+    }
+
+    for shard_no in range(len(run["shards"])):
+        result = results.get(shard_no)
+        if not result or result["status"] != "success":
+            summary["failed_shards"].append(shard_no)
+            continue
+
+        summary["states"] += result["states"]
+        summary["cities"] += result["cities"]
+        for doctype, stats in result["stats"].items():
+            totals = summary["stats"].setdefault(doctype, {})
+            for counter, value in stats.items():
+                totals[counter] = totals.get(counter, 0) + value
+
+    if summary["failed_shards"]:
+        summary["status"] = "partial"
+        frappe.logger().error(f"Location import {run_id}: shards {summary['failed_shards']} failed")
+        frappe.publish_realtime(
+            event="location_import_failed",
+            message=f"Location data import {run_id} finished with failed shards {summary['failed_shards']}. "
+            "Retry them with erpnext_location.erpnext_location.utils.import_coordinator.retry_failed_shards",
+            user="Administrator"
+        )
+    else:
+        frappe.logger().info(f"Location import {run_id} completed: {summary}")
+        frappe.publish_realtime(
+            event="location_import_completed",
+            message=f"Location data import completed successfully. {summary}",
+            user="Administrator"
+        )
+
+    return summary
+
+
+@frappe.whitelist()
+def retry_failed_shards(run_id):
+    """Re-enqueue the shards of a run that failed or never reported"""
+    frappe.only_for("System Manager")
+
+    run = get_run(run_id)
+    results = get_shard_results(run_id)
+    failed = [
+        shard_no for shard_no in range(len(run["shards"]))
+        if results.get(shard_no, {}).get("status") != "success"
+    ]
+
+    for shard_no in failed:
+        frappe.cache.hdel(get_results_key(run_id), str(shard_no))
+        enqueue_shard(run_id, shard_no)
+
+    return failed
+
+
+@frappe.whitelist()
+def get_sharded_import_status(run_id):
+    """Per-shard status of a sharded import run"""
+    frappe.only_for("System Manager")
+
+    run = get_run(run_id)
+    results = get_shard_results(run_id)
+    return [
+        {
+            "shard_no": shard_no,
+            "countries": countries,
+            "status": results.get(shard_no, {}).get("status", "queued"),
+        }
+        for shard_no, countries in enumerate(run["shards"])
+    ]
@@ -0,0 +1,89 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Composite and cross-app indexes for location lookups.
+
+Single-column indexes of our own doctypes are declared with `search_index` in
+their JSON. Composite indexes, and indexes on ERPNext's Country, are created here
+from `on_doctype_update` and the add_location_indexes patch.
+"""
+
+import frappe
+
+from erpnext_location.erpnext_location.utils.db import quote_column
+
+INDEXES = {
+    # Link filters and state search within a country
+    "City": [["country", "state"], ["country_code", "external_id"]],
+    # State lookup by code, and the shard-scoped external_id scans of the importer
+    "State": [["country", "state_code"], ["country_code", "external_id"]],
+    # Importer and State controller resolve countries by code
+    "Country": [["code"]],
+    # Prefix range scans of the City and State typeahead
+    "Location Search Index": [["location_doctype", "token"]],
+}
+
+
+def add_indexes(doctype=None):
+    """Create the indexes of one doctype, or of all of them"""
+    for index_doctype, indexes in INDEXES.items():
+        if doctype and index_doctype != doctype:
+            continue
+        for fields in indexes:
+            frappe.db.add_index(index_doctype, fields)
+
+
+def get_hot_queries():
+    """(label, sql, values) of the lookups the importer and controllers run most"""
+    city, state, country = (quote_column(f"tab{doctype}") for doctype in ("City", "State", "Country"))
+    sample_city = frappe.db.get_value("City", {}, ["name", "state", "country", "country_code"], as_dict=True) or frappe._dict()
+    sample_state = frappe.db.get_value("State", {}, ["name", "country", "state_code"], as_dict=True) or frappe._dict()
+    sample_country = frappe.db.get_value("Country", {}, ["name", "code"], as_dict=True) or frappe._dict()
+
+    return [
+        (
+            "City by country and state",
+            f"SELECT name FROM {city} WHERE country = %(country)s AND state = %(state)s",
+            {"country": sample_city.country, "state": sample_city.state},
+        ),
+        (
+            "City external ids of a shard",
+            f"SELECT external_id FROM {city} WHERE external_id IS NOT NULL AND country_code IN %(codes)s",
+            {"codes": (sample_city.country_code or "",)},
+        ),
+        (
+            "City by external id",
+            f"SELECT name FROM {city} WHERE external_id = %(external_id)s",
+            {"external_id": "1"},
+        ),
+        (
+            "State by country and code",
+            f"SELECT name FROM {state} WHERE country = %(country)s AND state_code = %(state_code)s",
+            {"country": sample_state.country, "state_code": sample_state.state_code},
+        ),
+        (
+            "Country by code",
+            f"SELECT name FROM {country} WHERE code = %(code)s",
+            {"code": sample_country.code},
+        ),
+        (
+            "City link reconciliation",
+            f"SELECT COUNT(*) FROM {city} ci JOIN {state} s ON s.name = ci.state WHERE s.country_code IN %(codes)s",
+            {"codes": (sample_city.country_code or "",)},
+        ),
+    ]
+
+
+def explain_hot_queries():
+    """Print the EXPLAIN plan of each hot query.
+
+    bench --site <site> execute erpnext_location.erpnext_location.utils.indexes.explain_hot_queries
+    """
+    plans = {}
+    for label, sql, values in get_hot_queries():
+        rows = frappe.db.sql(f"EXPLAIN {sql}", values, as_dict=True)
+        plans[label] = rows
+        print(f"\n{label}\n  {sql}")
+        for row in rows:
+            print("  " + ", ".join(f"{key}={value}" for key, value in row.items() if value is not None))
+    return plans
@@ -0,0 +1,157 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Cached parent lookups for City and State.
+
+Saving a City needs the country, codes, region and subregion of its State, and
+saving a State needs the code of its Country. Both are read here through a
+per-request memo backed by one expiring Redis value per record, so a busy
+integration does not load the full parent document for every row. Entries are
+dropped when a State or Country is saved, renamed or deleted, and again once that
+transaction commits; the importer clears everything after writing these tables
+without document hooks.
+"""
+
+from functools import partial
+
+import frappe
+
+from erpnext_location.erpnext_location.utils.cache import bump_generation
+from erpnext_location.erpnext_location.utils.consistency import (
+    STATE_COLUMNS,
+    reconcile_cities,
+    reconcile_states,
+)
+from erpnext_location.erpnext_location.utils.counters import recompute_counters
+from erpnext_location.erpnext_location.utils.geo import invalidate_city_index
+
+STATE_PARENTS_KEY = "location_state_parents"
+COUNTRY_CODES_KEY = "location_country_codes"
+# Columns of a State that its cities copy
+STATE_PARENT_FIELDS = ["country", "country_code", "state_code", "region", "subregion"]
+# Bounds how long an entry that raced with a clear can stay stale
+LOOKUP_TTL = 60 * 60
+
+
+def get_memo(key):
+    """Per-request memo of resolved entries"""
+    if not hasattr(frappe.local, "location_lookup_memo"):
+        frappe.local.location_lookup_memo = {}
+    return frappe.local.location_lookup_memo.setdefault(key, {})
+
+
+def get_cache_key(key, name):
+    return f"{key}:{name}"
+
+
+def get_state_parent(state):
+    """Return the STATE_PARENT_FIELDS of a State, or None if it does not exist"""
+    if not state:
+        return None
+
+    memo = get_memo(STATE_PARENTS_KEY)
+    if state not in memo:
+        cache_key = get_cache_key(STATE_PARENTS_KEY, state)
+        parent = frappe.cache.get_value(cache_key)
+        if parent is None:
+            row = frappe.db.get_value("State", state, STATE_PARENT_FIELDS, as_dict=True)
+            # Missing states are cached too, as {}; inserting the State clears the entry
+            parent = dict(row) if row else {}
+            frappe.cache.set_value(cache_key, parent, expires_in_sec=LOOKUP_TTL)
+        memo[state] = frappe._dict(parent) if parent else None
+
+    return memo[state]
+
+
+def get_country_code(country):
+    """Return the code of a Country, or None if it does not exist or has no code"""
+    if not country:
+        return None
+
+    memo = get_memo(COUNTRY_CODES_KEY)
+    if country not in memo:
+        cache_key = get_cache_key(COUNTRY_CODES_KEY, country)
+        code = frappe.cache.get_value(cache_key)
+        if code is None:
+            code = frappe.db.get_value("Country", country, "code") or ""
+            frappe.cache.set_value(cache_key, code, expires_in_sec=LOOKUP_TTL)
+        memo[country] = code or None
+
+    return memo[country]
+
+
+def load_state_parents():
+    """Load {state: STATE_PARENT_FIELDS} for every State in one query"""
+    parents = {state.name: state for state in frappe.get_all("State", fields=["name", *STATE_PARENT_FIELDS])}
+    get_memo(STATE_PARENTS_KEY).update(parents)
+    return parents
+
+
+def load_countries(fields):
+    """Load every Country with `fields` (name and code included) in one query"""
+    countries = frappe.get_all("Country", fields=list(dict.fromkeys(["name", "code", *fields])))
+    get_memo(COUNTRY_CODES_KEY).update({country.name: country.code or None for country in countries})
+    return countries
+
+
+def clear_state_parent(*states):
+    """Drop cached entries of the given States, or of all States"""
+    clear(STATE_PARENTS_KEY, states)
+
+
+def clear_country_code(*countries):
+    """Drop cached entries of the given Countries, or of all Countries"""
+    clear(COUNTRY_CODES_KEY, countries)
+
+
+def clear(key, names):
+    """Drop entries now and again after commit, so a reader that fetched the old row
+    before the commit cannot leave it cached"""
+    memo = get_memo(key)
+    if not names:
+        memo.clear()
+    for name in names:
+        memo.pop(name, None)
+
+    delete_entries(key, names)
+    frappe.db.after_commit.add(partial(delete_entries, key, names))
+
+
+def delete_entries(key, names):
+    if names:
+        frappe.cache.delete_value([get_cache_key(key, name) for name in names])
+    else:
+        frappe.cache.delete_keys(get_cache_key(key, ""))
+
+
+def clear_lookup_cache():
+    clear_state_parent()
+    clear_country_code()
+
+
+def on_country_change(doc, method=None):
+    """doc_events handler for Country on_update and on_trash"""
+    clear_country_code(doc.name)
+    bump_generation(doc)
+    if method == "on_update" and not doc.flags.in_location_import:
+        realign_country(doc)
+
+
+def realign_country(doc):
+    """Copy a changed code, region or subregion of a Country to its states and cities"""
+    before = doc.get_doc_before_save()
+    if not before or not any(doc.has_value_changed(field) for field in STATE_COLUMNS.values()):
+        return
+
+    codes = list({code for code in (doc.code, before.code) if code})
+    reconcile_states(codes)
+    reconcile_cities(codes)
+    clear_state_parent()
+    recompute_counters()
+
+
+def on_country_rename(doc, method=None, old=None, new=None, merge=False):
+    """doc_events handler for Country after_rename"""
+    clear_country_code(old, new)
+    bump_generation(doc)
+    invalidate_city_index(doc)
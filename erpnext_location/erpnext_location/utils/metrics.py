@@ -0,0 +1,47 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+from contextlib import contextmanager
+from functools import wraps
+
+import frappe
+
+
+@contextmanager
+def count_queries(counter=None):
+    """Count frappe.db.sql calls made inside the block in counter["queries"]"""
+    counter = counter if counter is not None else {}
+    counter.setdefault("queries", 0)
+    original_sql = frappe.db.sql
+
+    def sql(*args, **kwargs):
+        counter["queries"] += 1
+        return original_sql(*args, **kwargs)
+
+    frappe.db.sql = sql
+    try:
+        yield counter
+    finally:
+        frappe.db.sql = original_sql
+
+
+def instrumented_stage(stage):
+    """Record timing, query and row metrics of an importer stage method"""
+
+    def decorator(method):
+        @wraps(method)
+        def wrapper(importer, *args, **kwargs):
+            importer.start_stage_metrics(stage)
+            counter = {"queries": 0}
+            succeeded = False
+            try:
+                with count_queries(counter):
+                    result = method(importer, *args, **kwargs)
+                succeeded = True
+                return result
+            finally:
+                importer.finish_stage_metrics(stage, counter["queries"], succeeded)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,246 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Batch resolution of free-text (city, state, country) triples to location links.
+
+A batch is resolved with one query per level instead of lookups per row:
+countries are matched on name, iso2 or iso3 code, states on name or state_code,
+and cities through the full-name tokens of Location Search Index. Each match
+scores EXACT when the text equals the stored value ignoring case, FOLDED when it
+only matches after accent folding, and INFERRED when a parent is taken from its
+only matching child. A row's confidence is the product of the scores of the
+links returned, halved for each given part that could not be matched.
+"""
+
+import frappe
+from frappe.utils import cint, flt
+
+from erpnext_location.erpnext_location.utils.counters import recompute_counters
+from erpnext_location.erpnext_location.utils.db import quote_column
+from erpnext_location.erpnext_location.utils.lookup import load_countries
+from erpnext_location.erpnext_location.utils.search import SEARCH_DOCTYPE, normalize
+
+EXACT = 1.0
+FOLDED = 0.9
+INFERRED = 0.8
+UNMATCHED = 0.5
+
+# Addresses are only linked when the whole triple resolves at least this well
+MIN_ADDRESS_CONFIDENCE = 0.8
+TOKEN_CHUNK_SIZE = 1000
+
+
+def parse_rows(rows):
+    """[(city, state, country)] from a list of dicts or of 3-item lists"""
+    triples = []
+    for row in frappe.parse_json(rows) or []:
+        if isinstance(row, dict):
+            triples.append((row.get("city"), row.get("state"), row.get("country")))
+        else:
+            city, state, country = [*list(row), None, None, None][:3]
+            triples.append((city, state, country))
+    return triples
+
+
+def exact_key(value):
+    return (value or "").strip().casefold()
+
+
+class Candidates:
+    """Names reachable from a text key, kept separately for exact and accent-folded keys"""
+
+    def __init__(self):
+        self.exact = {}
+        self.folded = {}
+
+    def add(self, key, candidate):
+        if key:
+            self.exact.setdefault(exact_key(key), []).append(candidate)
+            self.folded.setdefault(normalize(key), []).append(candidate)
+
+    def get(self, value):
+        """[(candidate, score)], exact matches only when there are any"""
+        if not exact_key(value):
+            return []
+        matches = self.exact.get(exact_key(value))
+        if matches:
+            return [(candidate, EXACT) for candidate in dict.fromkeys(matches)]
+        return [(candidate, FOLDED) for candidate in dict.fromkeys(self.folded.get(normalize(value), []))]
+
+
+class LocationResolver:
+    def __init__(self, triples):
+        self.triples = triples
+        self.countries = Candidates()
+        self.states = Candidates()
+        self.cities = {}
+
+    def resolve(self):
+        self.load_countries()
+        country_matches = [self.countries.get(country) for _city, _state, country in self.triples]
+        self.load_states(country_matches)
+        self.load_cities()
+        return [
+            self.resolve_row(triple, countries) for triple, countries in zip(self.triples, country_matches, strict=True)
+        ]
+
+    def load_countries(self):
+        fields = ["iso3"] if frappe.get_meta("Country").has_field("iso3") else []
+        for country in load_countries(fields):
+            for key in (country.name, country.code, country.get("iso3")):
+                self.countries.add(key, country.name)
+
+    def load_states(self, country_matches):
+        """Active states of the countries in the batch, or of all countries if a row names none"""
+        filters = {"is_active": 1}
+        if all(matches for (_city, state, _country), matches in zip(self.triples, country_matches, strict=True) if state):
+            filters["country"] = ["in", list({name for matches in country_matches for name, _score in matches}) or [""]]
+
+        for state in frappe.get_all("State", filters=filters, fields=["name", "state_name", "state_code", "country"]):
+            candidate = (state.name, state.country)
+            for key in (state.name, state.state_name, state.state_code):
+                self.states.add(key, candidate)
+
+    def load_cities(self):
+        """Active cities whose whole name matches a city of the batch, from the search index tokens"""
+        tokens = list({normalize(city) for city, _state, _country in self.triples if normalize(city)})
+        table = quote_column(f"tab{SEARCH_DOCTYPE}")
+        for start in range(0, len(tokens), TOKEN_CHUNK_SIZE):
+            for location, label, token, state, country in frappe.db.sql(
+                f"SELECT location, label, token, state, country FROM {table} "
+                "WHERE location_doctype = 'City' AND full_name = 1 AND token IN %(tokens)s",
+                {"tokens": tuple(tokens[start:start + TOKEN_CHUNK_SIZE])},
+            ):
+                self.cities.setdefault(token, []).append((location, exact_key(label), state, country))
+
+    def get_cities(self, value):
+        """[((city, state, country), score)] of the cities matching a name"""
+        matches = self.cities.get(normalize(value), [])
+        exact = [(city, state, country) for city, label, state, country in matches if label == exact_key(value)]
+        if exact:
+            return [(candidate, EXACT) for candidate in exact]
+        return [((city, state, country), FOLDED) for city, _label, state, country in matches]
+
+    def resolve_row(self, triple, country_matches):
+        city_text, state_text, country_text = triple
+        country = state = city = None
+        scores = []
+
+        if len(country_matches) == 1:
+            country, score = country_matches[0]
+            scores.append(score)
+
+        if state_text:
+            matches = [
+                ((name, parent), score) for (name, parent), score in self.states.get(state_text)
+                if not country or parent == country
+            ]
+            if len(matches) == 1:
+                (state, parent), score = matches[0]
+                scores.append(score)
+                if not country:
+                    country = parent
+                    scores.append(INFERRED)
+
+        if city_text:
+            matches = [
+                (candidate, score) for candidate, score in self.get_cities(city_text)
+                if (not state or candidate[1] == state) and (not country or candidate[2] == country)
+            ]
+            if len(matches) == 1:
+                (city, parent, grandparent), score = matches[0]
+                scores.append(score)
+                if not state:
+                    state = parent
+                    scores.append(INFERRED)
+                if not country:
+                    country = grandparent
+                    scores.append(INFERRED)
+
+        confidence = 1.0 if (country or state or city) else 0.0
+        for score in scores:
+            confidence *= score
+        for text, link in ((city_text, city), (state_text, state), (country_text, country)):
+            if exact_key(text) and not link:
+                confidence *= UNMATCHED
+
+        return frappe._dict(city=city, state=state, country=country, confidence=round(confidence, 3))
+
+
+def resolve_rows(triples):
+    """Resolve [(city, state, country)] to [{city, state, country, confidence}] in a few queries"""
+    if not triples:
+        return []
+    return LocationResolver(triples).resolve()
+
+
+def set_address_locations(doc, method=None):
+    """doc_events handler for Address validate: link the City and State of a new or changed address"""
+    if (doc.location_city or doc.location_state) and (
+        doc.is_new() or any(doc.has_value_changed(field) for field in ("location_city", "location_state"))
+    ):
+        # Links picked on the form win over matching the text fields
+        doc.location_match_confidence = 1
+        return
+    if not doc.is_new() and not any(doc.has_value_changed(field) for field in ("city", "state", "country")):
+        return
+
+    result = resolve_rows([(doc.city, doc.state, doc.country)])[0]
+    confident = result.confidence >= MIN_ADDRESS_CONFIDENCE
+    doc.location_city = result.city if confident else None
+    doc.location_state = result.state if confident else None
+    doc.location_match_confidence = result.confidence
+
+
+def backfill_address_locations(chunk_size=1000, overwrite=False, min_confidence=MIN_ADDRESS_CONFIDENCE):
+    """Link existing addresses to City and State, resolving one chunk of addresses per batch"""
+    chunk_size, min_confidence = cint(chunk_size) or 1000, flt(min_confidence)
+    linked, last_name = 0, ""
+    while True:
+        filters = {"name": [">", last_name]}
+        if not cint(overwrite):
+            filters["location_city"] = ["is", "not set"]
+        addresses = frappe.get_all(
+            "Address",
+            filters=filters,
+            fields=["name", "city", "state", "country"],
+            order_by="name asc",
+            limit_page_length=chunk_size,
+        )
+        if not addresses:
+            break
+        last_name = addresses[-1].name
+
+        results = resolve_rows([(address.city, address.state, address.country) for address in addresses])
+        updates = {
+            address.name: {
+                "location_city": result.city,
+                "location_state": result.state,
+                "location_match_confidence": result.confidence,
+            }
+            for address, result in zip(addresses, results, strict=True)
+            if result.confidence >= min_confidence
+        }
+        if updates:
+            frappe.db.bulk_update("Address", updates, chunk_size=500, update_modified=False)
+            linked += len(updates)
+        frappe.db.commit()
+
+    recompute_counters(["linked_addresses"])
+    frappe.db.commit()
+    frappe.logger().info(f"Linked {linked} addresses to City and State")
+    return linked
+
+
+@frappe.whitelist()
+def enqueue_address_backfill(overwrite=False, min_confidence=MIN_ADDRESS_CONFIDENCE):
+    """Run backfill_address_locations in the long queue"""
+    frappe.only_for("System Manager")
+    frappe.enqueue(
+        method="erpnext_location.erpnext_location.utils.resolve.backfill_address_locations",
+        queue="long",
+        timeout=7200,
+        job_name="address_location_backfill",
+        overwrite=cint(overwrite),
+        min_confidence=flt(min_confidence),
+    )
@@ -0,0 +1,80 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Group records by any level of the Region > Subregion > Country > State > City hierarchy.
+
+City, State and Country carry every ancestor as an indexed column (see
+consistency.py), so any doctype with a Link to one of them reaches every level
+with a single join on that Link:
+
+    SELECT loc.region, COUNT(*)
+    FROM `tabAddress` JOIN `tabCity` loc ON loc.name = `tabAddress`.location_city
+    GROUP BY loc.region
+"""
+
+import frappe
+from frappe.desk.reportview import get_filters_cond, get_match_cond
+
+from erpnext_location.erpnext_location.utils.db import quote_column
+
+# Column holding each level on the linked doctype
+LEVEL_COLUMNS = {
+    "City": {"region": "region", "subregion": "subregion", "country": "country", "state": "state", "city": "name"},
+    "State": {"region": "region", "subregion": "subregion", "country": "country", "state": "name"},
+    "Country": {"region": "region", "subregion": "subregion", "country": "name"},
+}
+NUMERIC_FIELDTYPES = ("Int", "Float", "Currency", "Percent")
+
+
+def get_location_doctype(doctype, location_field):
+    """City, State or Country linked by `location_field` of `doctype`"""
+    df = frappe.get_meta(doctype).get_field(location_field)
+    if not df or df.fieldtype != "Link" or df.options not in LEVEL_COLUMNS:
+        frappe.throw(f"{doctype}.{location_field} is not a Link to City, State or Country")
+    return df.options
+
+
+def get_level_column(location_doctype, level):
+    column = LEVEL_COLUMNS[location_doctype].get(level)
+    if not column:
+        frappe.throw(f"{location_doctype} cannot be grouped by {level}; use one of {', '.join(LEVEL_COLUMNS[location_doctype])}")
+    return column
+
+
+def get_hierarchy_join(doctype, location_field, alias="loc"):
+    """JOIN clause making every hierarchy level of a record's location available as `alias`.<level column>"""
+    location_doctype = get_location_doctype(doctype, location_field)
+    return (
+        f"JOIN {quote_column(f'tab{location_doctype}')} {alias} "
+        f"ON {alias}.name = {quote_column(f'tab{doctype}')}.{quote_column(location_field)}"
+    )
+
+
+def get_rollup(doctype, location_field, level, value_field=None, filters=None):
+    """[{<level>, count, total}] of the records of `doctype` grouped by a level of their location.
+
+    `total` sums `value_field` when one is given. Filters and the user's
+    permissions on `doctype` apply as in a report.
+    """
+    meta = frappe.get_meta(doctype)
+    column = get_level_column(get_location_doctype(doctype, location_field), level)
+    table = quote_column(f"tab{doctype}")
+
+    total = ""
+    if value_field:
+        df = meta.get_field(value_field)
+        if not df or df.fieldtype not in NUMERIC_FIELDTYPES:
+            frappe.throw(f"{doctype}.{value_field} is not a numeric field")
+        total = f", SUM({table}.{quote_column(value_field)}) AS total"
+
+    conditions = get_filters_cond(doctype, filters, []) if filters else ""
+    return frappe.db.sql(
+        f"""
+        SELECT loc.{quote_column(column)} AS {quote_column(level)}, COUNT(*) AS count{total}
+        FROM {table} {get_hierarchy_join(doctype, location_field)}
+        WHERE 1=1 {conditions} {get_match_cond(doctype)}
+        GROUP BY loc.{quote_column(column)}
+        ORDER BY count DESC
+        """,
+        as_dict=True,
+    )
@@ -0,0 +1,203 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+"""Typeahead search for City and State Link fields.
+
+Frappe's default link search runs LIKE '%txt%' over the whole table. Instead,
+every active City and State gets rows in Location Search Index: its accent-folded,
+lowercase name and each word of it. A search is then a prefix range scan on the
+(location_doctype, token) index, ranked by match quality and by how many
+addresses use the name.
+"""
+
+import re
+import unicodedata
+
+import frappe
+from frappe.utils import cint, now
+
+from erpnext_location.erpnext_location.utils.db import quote_column
+
+SEARCH_DOCTYPE = "Location Search Index"
+INSERT_FIELDS = (
+    "name", "creation", "modified", "owner", "modified_by",
+    "location_doctype", "location", "label", "token", "full_name", "weight", "country", "state",
+)
+# Stats of an import stage that mean its rows changed
+CHANGE_STATS = ("inserted", "updated", "removed", "reactivated", "deleted", "realigned")
+
+# Name field, matching Address field and parent columns of each indexed doctype
+SEARCH_SOURCES = {
+    "City": {"label": "city_name", "address_field": "city", "state": "state", "filters": ("country", "state")},
+    "State": {"label": "state_name", "address_field": "state", "state": None, "filters": ("country",)},
+}
+
+
+def normalize(text):
+    """Lowercase `text` without accents, with anything but letters and digits turned into single spaces"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+def get_tokens(label):
+    """[(token, full_name)] of a name: the whole name, then each distinct word of it"""
+    full = normalize(label)
+    if not full:
+        return []
+    tokens = [(full, 1)]
+    for word in dict.fromkeys(full.split()):
+        if word != full:
+            tokens.append((word, 0))
+    return tokens
+
+
+def get_address_weights(doctype):
+    """{normalized name: number of addresses using it} for the Address field matching `doctype`"""
+    if not frappe.db.table_exists("Address"):
+        return {}
+
+    field = quote_column(SEARCH_SOURCES[doctype]["address_field"])
+    weights = {}
+    for value, count in frappe.db.sql(
+        f"SELECT {field}, COUNT(*) FROM {quote_column('tabAddress')} WHERE {field} IS NOT NULL GROUP BY {field}"
+    ):
+        key = normalize(value)
+        weights[key] = weights.get(key, 0) + count
+    return weights
+
+
+def get_index_rows(doctype, location, weights):
+    """Insert values of the search rows of one City or State"""
+    source = SEARCH_SOURCES[doctype]
+    label = location.get(source["label"]) or location.name
+    weight = weights.get(normalize(label), 0)
+    timestamp = now()
+    return [
+        (
+            frappe.generate_hash(length=12), timestamp, timestamp, "Administrator", "Administrator",
+            doctype, location.name, label, token, full_name, weight,
+            location.country, location.get("state") if source["state"] else None,
+        )
+        for token, full_name in get_tokens(label)
+    ]
+
+
+def rebuild_search_index(doctype, country_codes=None):
+    """Rebuild the search rows of every active City or State, or of a shard of countries"""
+    source = SEARCH_SOURCES[doctype]
+    table, source_table = quote_column(f"tab{SEARCH_DOCTYPE}"), quote_column(f"tab{doctype}")
+    filters = {"is_active": 1}
+    if country_codes is None:
+        frappe.db.sql(f"DELETE FROM {table} WHERE location_doctype = %s", doctype)
+    else:
+        codes = tuple(country_codes) or ("",)
+        # Scoped by country so rows of locations deleted upstream go as well
+        frappe.db.sql(
+            f"DELETE FROM {table} WHERE location_doctype = %(doctype)s AND country IN "
+            f"(SELECT DISTINCT country FROM {source_table} WHERE country_code IN %(codes)s)",
+            {"doctype": doctype, "codes": codes},
+        )
+        filters["country_code"] = ["in", codes]
+
+    fields = ["name", source["label"], "country"] + ([source["state"]] if source["state"] else [])
+    weights = get_address_weights(doctype)
+    values = []
+    for location in frappe.get_all(doctype, filters=filters, fields=fields):
+        values += get_index_rows(doctype, location, weights)
+
+    frappe.db.bulk_insert(SEARCH_DOCTYPE, INSERT_FIELDS, values)
+    frappe.logger().info(f"Indexed {len(values)} search tokens for {doctype}")
+    return len(values)
+
+
+def is_stale(doctype, stats):
+    """Whether an import stage changed rows of `doctype` or its index was never built"""
+    return any(stats.get(key) for key in CHANGE_STATS) or not frappe.db.exists(
+        SEARCH_DOCTYPE, {"location_doctype": doctype}
+    )
+
+
+def update_search_index(doc, names=None):
+    """Replace the search rows of a saved City or State, dropping them if it is inactive"""
+    if doc.flags.in_location_import:
+        return
+
+    previous = frappe.get_all(
+        SEARCH_DOCTYPE,
+        filters={"location_doctype": doc.doctype, "location": ["in", names or [doc.name]]},
+        pluck="weight",
+    )
+    delete_search_index(doc.doctype, *(names or [doc.name]))
+    if doc.get("is_active"):
+        # Keep the address weight of the last rebuild; the name may have changed since
+        weights = {normalize(doc.get(SEARCH_SOURCES[doc.doctype]["label"]) or doc.name): max(previous, default=0)}
+        frappe.db.bulk_insert(SEARCH_DOCTYPE, INSERT_FIELDS, get_index_rows(doc.doctype, doc, weights))
+
+
+def delete_search_index(doctype, *names):
+    frappe.db.delete(SEARCH_DOCTYPE, {"location_doctype": doctype, "location": ["in", names]})
+
+
+def search_locations(doctype, txt, start=0, page_len=20, filters=None):
+    """(name, label, state, country) of matching active locations, best first"""
+    filters = filters if isinstance(filters, dict) else {}
+    values = {"doctype": doctype, "start": cint(start), "page_len": cint(page_len) or 20}
+    conditions = []
+    for field in SEARCH_SOURCES[doctype]["filters"]:
+        if filters.get(field):
+            conditions.append(f"AND {field} = %({field})s")
+            values[field] = filters[field]
+
+    txt = normalize(txt)
+    table = quote_column(f"tab{SEARCH_DOCTYPE}")
+    if not txt:
+        # Nothing typed yet: the most used names in the current country or state. Without
+        # one this would rank every location, so the field waits for input instead
+        if not conditions:
+            return []
+        return frappe.db.sql(
+            f"""
+            SELECT location, label, state, country, 1 AS match_rank, weight
+            FROM {table}
+            WHERE location_doctype = %(doctype)s AND full_name = 1 {" ".join(conditions)}
+            ORDER BY weight DESC, label
+            LIMIT %(page_len)s OFFSET %(start)s
+            """,
+            values,
+            as_list=True,
+        )
+
+    values["txt"] = txt
+    values["prefix"] = f"{txt}%"
+
+    return frappe.db.sql(
+        f"""
+        SELECT location, MAX(label) AS label, MAX(state) AS state, MAX(country) AS country,
+            MIN(CASE WHEN full_name = 1 AND token = %(txt)s THEN 0 WHEN full_name = 1 THEN 1 ELSE 2 END) AS match_rank,
+            MAX(weight) AS weight
+        FROM {table}
+        WHERE location_doctype = %(doctype)s AND token LIKE %(prefix)s {" ".join(conditions)}
+        GROUP BY location
+        ORDER BY match_rank, weight DESC, label
+        LIMIT %(page_len)s OFFSET %(start)s
+        """,
+        values,
+        as_list=True,
+    )
+
+
+@frappe.whitelist()
+@frappe.validate_and_sanitize_search_inputs
+def city_query(doctype, txt, searchfield, start, page_len, filters):
+    """standard_queries search for City; accepts country and state filters"""
+    frappe.has_permission("City", throw=True)
+    return [row[:4] for row in search_locations("City", txt, start, page_len, filters)]
+
+
+@frappe.whitelist()
+@frappe.validate_and_sanitize_search_inputs
+def state_query(doctype, txt, searchfield, start, page_len, filters):
+    """standard_queries search for State; accepts a country filter"""
+    frappe.has_permission("State", throw=True)
+    return [(row[0], row[1], row[3]) for row in search_locations("State", txt, start, page_len, filters)]
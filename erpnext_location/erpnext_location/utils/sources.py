@@ -0,0 +1,332 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# MIT License
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+import frappe
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ChunkedEncodingError
+from urllib3.util.retry import Retry
+
+DEFAULT_REPOSITORY_URL = "https://raw.githubusercontent.com/dr5hn/countries-states-cities-database/master"
+DEFAULT_BASE_URL = f"{DEFAULT_REPOSITORY_URL}/json"
+
+
+class LocationDataSource:
+    """Where the importer reads dataset files from"""
+
+    def open(self, filename):
+        """Return a binary file object for `filename`"""
+        raise NotImplementedError
+
+    def checksum(self, filename):
+        """Return the sha256 of `filename` as last read from this source"""
+        raise NotImplementedError
+
+    def get_local_path(self, filename):
+        """Return a path on disk for readers that cannot work on a file object"""
+        raise NotImplementedError
+
+    def prefetch(self, filenames):
+        """Start making `filenames` available in the background, if the source needs to"""
+        pass
+
+    def pop_transfer(self, filename):
+        """Return {"bytes", "seconds"} of the last download of `filename` once, if any"""
+        return None
+
+    def describe(self):
+        return self.__class__.__name__
+
+
+class LocalSource(LocationDataSource):
+    """Read dataset files from a local directory (plain path or file:// URL)"""
+
+    def __init__(self, path):
+        if path.startswith("file://"):
+            path = unquote(urlparse(path).path)
+        self.path = path
+
+    def get_path(self, filename):
+        return os.path.join(self.path, filename)
+
+    def open(self, filename):
+        return open(self.get_path(filename), "rb")
+
+    def get_local_path(self, filename):
+        return self.get_path(filename)
+
+    def checksum(self, filename):
+        return file_checksum(self.get_path(filename))
+
+    def describe(self):
+        return self.path
+
+
+class RemoteSource(LocationDataSource):
+    """Download dataset files over HTTP into an on-disk cache.
+
+    Every cached file has a sidecar `.meta.json` holding the ETag, Last-Modified
+    and sha256 of the last download. Later runs send a conditional request and
+    reuse the cached copy on 304; within `max_age` seconds no request is sent at all.
+
+    Files can be prefetched in parallel over one pooled session. Failed requests
+    are retried with exponential backoff, interrupted transfers resume with a
+    Range request from the `.part` file, and finished files are checked against
+    the expected size and, when configured, sha256.
+    """
+
+    def __init__(
+        self,
+        base_url=DEFAULT_BASE_URL,
+        cache_dir=None,
+        max_age=0,
+        timeout=(10, 60),
+        chunk_size=64 * 1024,
+        retries=5,
+        backoff=1.0,
+        max_workers=5,
+        checksums=None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.max_age = max_age
+        # (connect, read) timeouts; the read timeout applies between chunks, not to the whole file
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        # Expected sha256 per filename, verified after every download
+        self.checksums = checksums or {}
+        # Files already checked during this run, so each costs at most one request
+        self.fetched = {}
+        # Downloads started by prefetch, waited on by fetch
+        self.futures = {}
+        # Bytes and seconds of each download, collected by the importer's stage metrics
+        self.transfers = {}
+        self.session = None
+        # Downloads may run in worker threads without a frappe context, so log through this logger
+        self.logger = frappe.logger()
+
+    def get_session(self):
+        if not self.session:
+            # Error statuses are retried here; dropped connections are retried by download with a Range request
+            retry = Retry(
+                total=self.retries,
+                connect=0,
+                read=0,
+                status=self.retries,
+                backoff_factor=self.backoff,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset({"GET"}),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            self.session = requests.Session()
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def get_path(self, filename):
+        return os.path.join(self.cache_dir, filename)
+
+    def get_meta(self, filename, suffix=".meta.json"):
+        meta_path = self.get_path(filename) + suffix
+        data_path = self.get_path(filename) + (".part" if suffix == ".part.json" else "")
+        if not os.path.exists(meta_path) or not os.path.exists(data_path):
+            return {}
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def set_meta(self, filename, meta, suffix=".meta.json"):
+        with open(self.get_path(filename) + suffix, "w") as f:
+            json.dump(meta, f)
+
+    def prefetch(self, filenames):
+        """Start downloading `filenames` in parallel; fetch waits for each one"""
+        pending = [filename for filename in dict.fromkeys(filenames) if filename not in self.fetched and filename not in self.futures]
+        if not pending:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending)), thread_name_prefix="location-data")
+        for filename in pending:
+            self.futures[filename] = executor.submit(self.download, filename)
+        executor.shutdown(wait=False)
+
+    def fetch(self, filename):
+        """Make sure an up-to-date copy of `filename` is cached and return its path"""
+        if filename not in self.fetched:
+            future = self.futures.pop(filename, None)
+            self.fetched[filename] = future.result() if future else self.download(filename)
+        return self.fetched[filename]
+
+    def download(self, filename):
+        path = self.get_path(filename)
+        meta = self.get_meta(filename)
+
+        if meta and os.path.getsize(path) != meta.get("size", os.path.getsize(path)):
+            self.logger.warning(f"Cached {filename} does not match its recorded size, downloading it again")
+            meta = {}
+
+        if meta and self.max_age and time.time() - meta.get("fetched_at", 0) < self.max_age:
+            self.logger.info(f"Using cached {filename} (fetched less than {self.max_age}s ago)")
+            return path
+
+        started = time.monotonic()
+        # Bytes received over all attempts
+        progress = {"bytes": 0}
+        for attempt in range(self.retries + 1):
+            try:
+                self.transfer(filename, meta, progress)
+                break
+            except (requests.ConnectionError, requests.Timeout, ChunkedEncodingError, IncompleteDownload) as e:
+                if attempt == self.retries:
+                    raise LocationDataDownloadError(f"Downloading {filename} failed after {attempt + 1} attempts: {e}") from e
+                delay = self.backoff * 2 ** attempt
+                self.logger.warning(f"Downloading {filename} failed ({e}), resuming in {delay:.0f}s")
+                time.sleep(delay)
+
+        self.transfers[filename] = {"bytes": progress["bytes"], "seconds": time.monotonic() - started}
+        return path
+
+    def transfer(self, filename, meta, progress):
+        """Run one request for `filename`, resuming a partial download"""
+        url = f"{self.base_url}/{filename}"
+        path = self.get_path(filename)
+        partial_path = path + ".part"
+
+        # Identity encoding keeps byte ranges and Content-Length in terms of the stored file
+        headers = {"Accept-Encoding": "identity"}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        partial = self.get_meta(filename, ".part.json")
+        offset = os.path.getsize(partial_path) if partial else 0
+        if offset and (partial.get("etag") or partial.get("last_modified")):
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = partial.get("etag") or partial["last_modified"]
+        else:
+            offset = 0
+
+        self.logger.info(f"Downloading {filename} from {self.base_url}" + (f", resuming at byte {offset}" if offset else "..."))
+        with self.get_session().get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304:
+                self.logger.info(f"{filename} unchanged upstream, using cached copy")
+                meta["fetched_at"] = time.time()
+                self.set_meta(filename, meta)
+                return
+
+            response.raise_for_status()
+            if response.status_code != 206:
+                # Range ignored, or the file changed since the partial download
+                offset = 0
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+            self.set_meta(filename, validators, ".part.json")
+            expected_size = get_expected_size(response, offset)
+
+            with open(partial_path, "ab" if offset else "wb") as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    progress["bytes"] += len(chunk)
+
+        size = os.path.getsize(partial_path)
+        if expected_size is not None and size != expected_size:
+            raise IncompleteDownload(f"received {size} of {expected_size} bytes")
+
+        sha256 = file_checksum(partial_path)
+        expected_checksum = self.checksums.get(filename)
+        if expected_checksum and sha256 != expected_checksum.lower():
+            os.remove(partial_path)
+            raise LocationDataDownloadError(f"Checksum mismatch for {filename}: expected {expected_checksum}, got {sha256}")
+
+        os.replace(partial_path, path)
+        os.remove(path + ".part.json")
+        self.set_meta(filename, {
+            "url": url,
+            **validators,
+            "sha256": sha256,
+            "size": size,
+            "fetched_at": time.time(),
+        })
+
+        self.logger.info(f"Downloaded {filename} ({size} bytes)")
+
+    def open(self, filename):
+        return open(self.fetch(filename), "rb")
+
+    def pop_transfer(self, filename):
+        return self.transfers.pop(filename, None)
+
+    def get_local_path(self, filename):
+        return self.fetch(filename)
+
+    def checksum(self, filename):
+        path = self.fetch(filename)
+        return self.get_meta(filename).get("sha256") or file_checksum(path)
+
+    def describe(self):
+        return self.base_url
+
+
+class LocationDataDownloadError(Exception):
+    pass
+
+
+class IncompleteDownload(Exception):
+    """A transfer ended before the expected number of bytes; retried with a Range request"""
+
+
+def get_expected_size(response, offset):
+    """Total size of the file being downloaded, from Content-Range or Content-Length"""
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    content_length = response.headers.get("Content-Length")
+    if content_length is not None:
+        return offset + int(content_length)
+    return None
+
+
+def file_checksum(path, chunk_size=1024 * 1024):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_cache_dir():
+    return frappe.get_site_path("private", "location_data")
+
+
+def get_source(source=None, directory="json"):
+    """Build a data source from a URL or local path.
+
+    Falls back to the `location_data_source` site config key, then to the export
+    `directory` of the upstream GitHub repository. `location_data_cache_max_age`
+    (seconds) lets remote sources skip the conditional request entirely for
+    recently fetched files, and `location_data_checksums` maps filenames to the
+    sha256 their downloads must have.
+    """
+    if isinstance(source, LocationDataSource):
+        return source
+
+    source = source or frappe.conf.get("location_data_source") or f"{DEFAULT_REPOSITORY_URL}/{directory}"
+    if source.startswith(("http://", "https://")):
+        return RemoteSource(
+            source,
+            max_age=frappe.conf.get("location_data_cache_max_age") or 0,
+            checksums=frappe.conf.get("location_data_checksums"),
+        )
+    return LocalSource(source)
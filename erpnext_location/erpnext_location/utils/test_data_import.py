@@ -0,0 +1,144 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# See license.txt
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_location.erpnext_location.utils import data_import
+from erpnext_location.erpnext_location.utils.data_import import LocationDataImporter
+from erpnext_location.erpnext_location.utils.import_coordinator import plan_shards
+
+STATES = [
+    {"id": 1, "name": "Punjab", "country_code": "IN", "iso2": "PB"},
+    {"id": 2, "name": "Punjab", "country_code": "PK", "iso2": "PB"},
+    {"id": 3, "name": "Kerala", "country_code": "IN", "iso2": "KL"},
+    {"id": 4, "name": "Texas", "country_code": "US", "iso2": "TX"},
+]
+CITIES = [
+    {"id": 10, "name": "Ludhiana", "state_name": "Punjab", "country_code": "IN"},
+    {"id": 11, "name": "Lahore", "state_name": "Punjab", "country_code": "PK"},
+    {"id": 12, "name": "Kochi", "state_name": "Kerala", "country_code": "IN"},
+    {"id": 13, "name": "Austin", "state_name": "Texas", "country_code": "US"},
+]
+EXISTING_CITIES = [
+    frappe._dict(name="Ludhiana-Punjab", external_id="10", is_active=1, country_code="in"),
+    frappe._dict(name="Kochi-Kerala", external_id="12", is_active=1, country_code="in"),
+    frappe._dict(name="Austin-Texas", external_id="13", is_active=1, country_code="us"),
+]
+STATE_PARENTS = {
+    "Punjab": frappe._dict(name="Punjab", country="India", country_code="in", state_code="PB"),
+    "Kerala": frappe._dict(name="Kerala", country="India", country_code="in", state_code="KL"),
+    "Texas": frappe._dict(name="Texas", country="United States", country_code="us", state_code="TX"),
+}
+
+
+class TestLocationDataImporter(FrappeTestCase):
+    def import_stage(self, importer, method, records):
+        """Run a state or city stage against `records` and return the rows it would write"""
+        written = []
+
+        def import_rows(doctype, rows, *args, **kwargs):
+            written.extend(rows)
+            return len(written)
+
+        with (
+            patch.object(data_import, "load_state_parents", return_value=dict(STATE_PARENTS)),
+            patch.object(importer, "load_records", return_value=records),
+            patch.object(importer, "load_country_maps", return_value=({"in": "India", "pk": "Pakistan", "us": "United States"}, {}, {})),
+            patch.object(importer, "begin_stage", return_value=0),
+            patch.object(importer, "import_rows", side_effect=import_rows),
+            patch.object(importer, "reconcile_links"),
+            patch.object(importer, "refresh_search_index"),
+            patch.object(importer, "start_stage_metrics"),
+            patch.object(importer, "finish_stage_metrics"),
+        ):
+            getattr(importer, method)()
+        return written
+
+    def reconcile(self, importer, seen_external_ids):
+        """Reconcile the City stage against EXISTING_CITIES and return the mocked set_value"""
+
+        def get_all(doctype, filters=None, fields=None, as_list=False, pluck=None):
+            country_codes = filters.get("country_code", ["in", None])[1]
+            rows = [row for row in EXISTING_CITIES if country_codes is None or row.country_code in country_codes]
+            return [[row[field] for field in fields] for row in rows]
+
+        with (
+            patch.object(frappe, "get_meta") as get_meta,
+            patch.object(frappe, "get_all", side_effect=get_all),
+            patch.object(frappe.db, "set_value") as set_value,
+            patch.object(frappe.db, "commit"),
+        ):
+            get_meta.return_value.has_field.return_value = True
+            importer.reconcile_removed("City", seen_external_ids)
+        return set_value
+
+    def test_cities_resolve_states_within_their_country(self):
+        importer = LocationDataImporter()
+        rows = {row["city_name"]: row for row in self.import_stage(importer, "import_cities", CITIES)}
+
+        self.assertEqual(rows["Ludhiana"]["country_code"], "in")
+        # Punjab is India's state; Lahore is not filed under it
+        self.assertNotIn("Lahore", rows)
+        self.assertEqual(importer.get_stats("City").skipped, 1)
+        self.assertIn("not found in pk", importer.failure_samples[0]["reason"])
+
+    def test_scoped_cities_keep_the_scope_country(self):
+        importer = LocationDataImporter()
+        importer.country_codes = {"pk"}
+        self.assertEqual(self.import_stage(importer, "import_cities", CITIES), [])
+
+        importer = LocationDataImporter()
+        importer.country_codes = {"in"}
+        rows = self.import_stage(importer, "import_cities", CITIES)
+        self.assertEqual({row["city_name"] for row in rows}, {"Ludhiana", "Kochi"})
+        self.assertTrue(all(importer.in_scope(row["country_code"]) for row in rows))
+
+    def test_state_name_held_by_another_country_is_skipped(self):
+        importer = LocationDataImporter()
+        rows = self.import_stage(importer, "import_states", STATES)
+
+        self.assertEqual([(row["name"], row["country_code"]) for row in rows if row["name"] == "Punjab"], [("Punjab", "in")])
+        self.assertEqual(importer.get_stats("State").skipped, 1)
+
+    def test_countries_sharing_a_state_name_share_a_shard(self):
+        importer = LocationDataImporter()
+        with patch.object(importer, "load_records", side_effect=lambda dataset: CITIES if dataset == "cities" else STATES):
+            shards = plan_shards(importer, 8)
+
+        self.assertEqual(sorted(map(sorted, shards)), [["in", "pk"], ["us"]])
+
+    def test_scoped_reconcile_leaves_other_countries_alone(self):
+        importer = LocationDataImporter()
+        importer.country_codes = {"in"}
+        # Kochi is upstream but failed to import this run
+        importer.record_failure("City", CITIES[2], "State Kerala not found in in")
+
+        # Austin is outside the scope and Kochi still upstream
+        self.reconcile(importer, {"10"}).assert_not_called()
+
+        # A record of another country does not keep an in-scope row active
+        set_value = self.reconcile(importer, {"13"})
+        set_value.assert_called_once_with("City", {"name": ["in", ["Ludhiana-Punjab"]]}, "is_active", 0)
+        self.assertEqual(importer.get_stats("City").removed, 1)
+
+    def test_dry_run_counts_deactivations(self):
+        importer = LocationDataImporter(dry_run=True)
+        set_value = self.reconcile(importer, {"10", "12"})
+
+        set_value.assert_not_called()
+        self.assertEqual(importer.get_dry_run_report()["City"]["deactivations"], 1)
+        self.assertEqual(importer.get_diff("City").samples.deactivations, ["Austin-Texas"])
+
+    def test_optional_levels_are_skipped_when_unreadable(self):
+        importer = LocationDataImporter()
+        with patch.object(importer.data_format, "load", side_effect=OSError("404 Not Found")):
+            self.assertEqual(importer.download_data("regions"), [])
+            self.assertEqual(importer.download_data("subregions"), [])
+            for dataset in ("countries", "states", "cities"):
+                with self.assertRaises(OSError):
+                    importer.download_data(dataset)
+
+        self.assertEqual([sample["doctype"] for sample in importer.failure_samples], ["Region", "Subregion"])
@@ -0,0 +1,81 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# See license.txt
+
+import json
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_location.erpnext_location.utils.formats import (
+    CsvFormat,
+    GzipJsonFormat,
+    JsonFormat,
+    iter_json_array,
+)
+
+RECORDS = [
+    {"id": 1, "name": "São Paulo", "latitude": "-23.55052000", "tags": ["a", "b"]},
+    {"id": 22, "name": 'Zürich, "ZH"', "latitude": None, "nested": {"x": [1, 2, {"y": "]"}]}},
+    {"id": 333, "name": "東京", "latitude": "35.68950000"},
+]
+SCALARS = [1, 23, -456, 7.5e3, "a, b", "[]", True, False, None, 0]
+
+
+def split(data, size):
+    return [data[start : start + size] for start in range(0, len(data), size)]
+
+
+class TestIterJsonArray(FrappeTestCase):
+    def assert_parses(self, items):
+        data = json.dumps(items, ensure_ascii=False, indent=1).encode()
+        # Every chunk size splits the items, and multi-byte characters, at different places
+        for size in range(1, 40):
+            self.assertEqual(list(iter_json_array(split(data, size))), items, f"chunk size {size}")
+
+    def test_records_split_across_chunks(self):
+        self.assert_parses(RECORDS)
+
+    def test_scalars_split_across_chunks(self):
+        self.assert_parses(SCALARS)
+
+    def test_number_cut_by_a_chunk_is_not_yielded_early(self):
+        self.assertEqual(list(iter_json_array([b"[12", b"34, 5", b"6]"])), [1234, 56])
+        self.assertEqual(list(iter_json_array([b"[7500.", b"0, 1e", b"3]"])), [7500.0, 1000.0])
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array([b" [ ", b" ] "])), [])
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"id": 1}']))
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[{"id": 1}, {"id"']))
+
+    def test_corrupt_array_stops_buffering(self):
+        read = []
+
+        def chunks():
+            yield b'[{"id": 1}, {"id": 2,, '
+            while True:
+                read.append(1)
+                yield b'"name": "x", ' * 100
+
+        with self.assertRaises(ValueError):
+            list(iter_json_array(chunks(), max_item_size=10_000))
+        # Gives up after about max_item_size characters, not at the end of the input
+        self.assertLess(len(read), 20)
+
+    def test_truncated_array(self):
+        data = json.dumps(RECORDS).encode()[:-30]
+        with self.assertRaises(ValueError):
+            list(iter_json_array(split(data, 7)))
+
+
+class TestFormatFilenames(FrappeTestCase):
+    def test_upstream_filenames(self):
+        # Paths of the json/ and csv/ exports of dr5hn/countries-states-cities-database
+        expected = {
+            dataset: dataset + ".json" for dataset in ("regions", "subregions", "countries", "states", "cities")
+        }
+        self.assertEqual(JsonFormat.filenames, expected)
+        self.assertEqual(GzipJsonFormat.filenames, {dataset: f"{filename}.gz" for dataset, filename in expected.items()})
+        self.assertEqual(CsvFormat.filenames, {dataset: dataset + ".csv" for dataset in expected})
@@ -0,0 +1,68 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# See license.txt
+
+import random
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_location.erpnext_location.utils.geo import (
+    MAX_PREFIXES,
+    KDTree,
+    encode_geohash,
+    get_covering_prefixes,
+    get_geohash,
+    to_point,
+)
+
+
+def random_point(rng):
+    return rng.uniform(-90, 90), rng.uniform(-180, 180)
+
+
+def squared_distance(a, b):
+    return sum((x - y) ** 2 for x, y in zip(a, b, strict=True))
+
+
+class TestGeohash(FrappeTestCase):
+    def test_geohash_encoding(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(encode_geohash(-23.55052, -46.633308, 5), "6gyf4")
+        self.assertEqual(get_geohash("57.64911", "10.40744"), "u4pruyd")
+        # 0, 0 is what the importer stores for missing coordinates
+        self.assertIsNone(get_geohash(0, 0))
+
+    def test_covering_prefixes_contain_every_point_of_the_box(self):
+        rng = random.Random(7)
+        for size in (0.001, 0.05, 1, 10):
+            for _ in range(20):
+                south, west = rng.uniform(-80, 80 - size), rng.uniform(-170, 170 - size)
+                north, east = south + size, west + size
+                prefixes = get_covering_prefixes(south, west, north, east)
+                self.assertTrue(prefixes)
+                self.assertLessEqual(len(prefixes), MAX_PREFIXES)
+                for _ in range(50):
+                    geohash = encode_geohash(rng.uniform(south, north), rng.uniform(west, east))
+                    self.assertTrue(any(geohash.startswith(prefix) for prefix in prefixes), (geohash, prefixes))
+
+    def test_covering_prefixes_give_up_on_huge_boxes(self):
+        self.assertIsNone(get_covering_prefixes(-90, -180, 90, 180))
+
+
+class TestKDTree(FrappeTestCase):
+    def test_kdtree_matches_brute_force(self):
+        rng = random.Random(11)
+        points = [to_point(*random_point(rng)) for _ in range(2000)]
+        tree = KDTree(points)
+        for _ in range(200):
+            query = to_point(*random_point(rng))
+            expected = sorted(squared_distance(point, query) for point in points)
+            for k in (1, 5):
+                found = tree.nearest(query, k)
+                self.assertEqual(len(found), k)
+                for (distance, index), expected_distance in zip(found, expected[:k], strict=True):
+                    self.assertAlmostEqual(distance, expected_distance)
+                    self.assertAlmostEqual(squared_distance(points[index], query), distance)
+
+    def test_kdtree_with_fewer_points_than_k(self):
+        self.assertEqual(KDTree([]).nearest(to_point(0, 0), 3), [])
+        self.assertEqual([index for _distance, index in KDTree([to_point(1, 1)]).nearest(to_point(0, 0), 3)], [0])
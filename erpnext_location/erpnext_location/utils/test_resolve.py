@@ -0,0 +1,88 @@
+# Copyright (c) 2025, Novizna PVT LTD.
+# See license.txt
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_location.erpnext_location.utils.resolve import (
+    EXACT,
+    FOLDED,
+    INFERRED,
+    UNMATCHED,
+    LocationResolver,
+    exact_key,
+)
+from erpnext_location.erpnext_location.utils.search import get_tokens, normalize
+
+COUNTRIES = {"India": ["IN", "IND"], "United States": ["US", "USA"], "Brazil": ["BR", "BRA"]}
+# name, state_code, country
+STATES = [
+    ("Kerala", "KL", "India"),
+    ("Illinois", "IL", "United States"),
+    ("Missouri", "MO", "United States"),
+    ("São Paulo", "SP", "Brazil"),
+]
+# name, city_name, state, country
+CITIES = [
+    ("Kochi-Kerala", "Kochi", "Kerala", "India"),
+    ("Springfield-Illinois", "Springfield", "Illinois", "United States"),
+    ("Springfield-Missouri", "Springfield", "Missouri", "United States"),
+    ("São Paulo-São Paulo", "São Paulo", "São Paulo", "Brazil"),
+]
+
+
+def get_resolver():
+    """A resolver holding the rows its load_* methods would read from the database"""
+    resolver = LocationResolver([])
+    for country, codes in COUNTRIES.items():
+        for key in (country, *codes):
+            resolver.countries.add(key, country)
+    for name, state_code, country in STATES:
+        for key in (name, state_code):
+            resolver.states.add(key, (name, country))
+    for name, city_name, state, country in CITIES:
+        token = get_tokens(city_name)[0][0]
+        resolver.cities.setdefault(token, []).append((name, exact_key(city_name), state, country))
+    return resolver
+
+
+class TestLocationResolver(FrappeTestCase):
+    def resolve(self, city=None, state=None, country=None):
+        resolver = get_resolver()
+        return resolver.resolve_row((city, state, country), resolver.countries.get(country))
+
+    def test_normalize(self):
+        self.assertEqual(normalize("  São-Paulo!! "), "sao paulo")
+        self.assertEqual(get_tokens("Saint Paul"), [("saint paul", 1), ("saint", 0), ("paul", 0)])
+
+    def test_exact_triple(self):
+        result = self.resolve("kochi", "Kerala", "IN")
+        self.assertEqual((result.city, result.state, result.country), ("Kochi-Kerala", "Kerala", "India"))
+        self.assertEqual(result.confidence, EXACT)
+
+    def test_accent_folded_triple(self):
+        result = self.resolve("Sao Paulo", "SP", "Brazil")
+        self.assertEqual(result.city, "São Paulo-São Paulo")
+        self.assertEqual(result.confidence, FOLDED)
+
+    def test_parents_inferred_from_a_unique_city(self):
+        result = self.resolve("Kochi")
+        self.assertEqual((result.state, result.country), ("Kerala", "India"))
+        self.assertEqual(result.confidence, round(EXACT * INFERRED * INFERRED, 3))
+
+    def test_ambiguous_city_is_left_unlinked(self):
+        result = self.resolve("Springfield", country="US")
+        self.assertIsNone(result.city)
+        self.assertIsNone(result.state)
+        self.assertEqual(result.country, "United States")
+        self.assertEqual(result.confidence, EXACT * UNMATCHED)
+
+    def test_state_settles_an_ambiguous_city(self):
+        result = self.resolve("Springfield", "MO", "US")
+        self.assertEqual(result.city, "Springfield-Missouri")
+        self.assertEqual(result.confidence, EXACT)
+
+    def test_unknown_parts_lower_confidence(self):
+        result = self.resolve("Atlantis", "Kerala", "India")
+        self.assertEqual((result.city, result.state), (None, "Kerala"))
+        self.assertEqual(result.confidence, EXACT * UNMATCHED)
+        self.assertEqual(self.resolve("Atlantis").confidence, 0)
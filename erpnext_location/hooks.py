@@ -27,10 +27,12 @@ app_license = "mit"
 # include js, css files in header of desk.html
 # app_include_css = "/assets/erpnext_location/css/erpnext_location.css"
 # app_include_js = "/assets/erpnext_location/js/erpnext_location.js"
+app_include_js = "erpnext_location.bundle.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/erpnext_location/css/erpnext_location.css"
 # web_include_js = "/assets/erpnext_location/js/erpnext_location.js"
+web_include_js = "erpnext_location.bundle.js"
 
 # include custom scss in every website theme (without file extension ".scss")
 # website_theme_scss = "erpnext_location/public/scss/website"
@@ -44,6 +46,7 @@ app_license = "mit"
 
 # include js in doctype views
 # doctype_js = {"doctype" : "public/js/doctype.js"}
+doctype_js = {"Address": "public/js/address.js"}
 # doctype_list_js = {"doctype" : "public/js/doctype_list.js"}
 # doctype_tree_js = {"doctype" : "public/js/doctype_tree.js"}
 # doctype_calendar_js = {"doctype" : "public/js/doctype_calendar.js"}
@@ -130,6 +133,12 @@ after_migrate = "erpnext_location.install.after_migrate"
 # 	"Event": "frappe.desk.doctype.event.event.has_permission",
 # }
 
+# Link field search backed by Location Search Index
+standard_queries = {
+	"City": "erpnext_location.erpnext_location.utils.search.city_query",
+	"State": "erpnext_location.erpnext_location.utils.search.state_query",
+}
+
 # DocType Class
 # ---------------
 # Override standard doctype classes
@@ -142,13 +151,18 @@ after_migrate = "erpnext_location.install.after_migrate"
 # ---------------
 # Hook on document methods and events
 
-# doc_events = {
-# 	"*": {
-# 		"on_update": "method",
-# 		"on_cancel": "method",
-# 		"on_trash": "method"
-# 	}
-# }
+doc_events = {
+	"Country": {
+		"on_update": "erpnext_location.erpnext_location.utils.lookup.on_country_change",
+		"on_trash": "erpnext_location.erpnext_location.utils.lookup.on_country_change",
+		"after_rename": "erpnext_location.erpnext_location.utils.lookup.on_country_rename",
+	},
+	"Address": {
+		"validate": "erpnext_location.erpnext_location.utils.resolve.set_address_locations",
+		"on_update": "erpnext_location.erpnext_location.utils.counters.update_counters",
+		"on_trash": "erpnext_location.erpnext_location.utils.counters.update_counters",
+	},
+}
 
 # Scheduled Tasks
 # ---------------
@@ -179,7 +193,7 @@ fixtures = [
         "doctype": "Custom Field",
         "filters": [
             [
-                "dt", "in", ["Country"]
+                "dt", "in", ["Country", "Address"]
             ]
         ]
     }
@@ -3,6 +3,7 @@
 
 import frappe
 from erpnext_location.erpnext_location.utils.data_import import refresh_location_data
+from erpnext_location.erpnext_location.utils.import_coordinator import enqueue_sharded_import
 
 
 def after_install():
@@ -38,17 +39,15 @@ def queue_location_data_import():
     try:
         frappe.logger().info("Queuing location data import as background job...")
 
-        # Queue the chunked import job to run in background
-        frappe.enqueue(
-            method="erpnext_location.erpnext_location.utils.data_import.refresh_location_data_chunked",
-            queue="long",  # Use long queue for time-consuming tasks
-            timeout=3600,  # 1 hour timeout
+        # Queue the coordinator, which fans states and cities out to one long-queue job per country shard
+        run_id = enqueue_sharded_import(
             force_update=True,
-            chunk_size=25,  # Smaller chunks for better progress
-            job_name="location_data_import"
+            bulk=True,  # Multi-row INSERTs instead of one save() per record
+            streaming=True,  # Parse states and cities incrementally to bound memory
+            full_snapshot=True,  # The whole upstream dataset, so rows missing from it are deactivated
         )
 
-        frappe.logger().info("Location data import queued successfully. Check background jobs status.")
+        frappe.logger().info(f"Location data import {run_id} queued successfully. Check background jobs status.")
 
         # Create a notification for admin
         frappe.publish_realtime(
@@ -66,7 +65,7 @@ def manual_location_import():
     """Manual method to import location data - can be called from console"""
     try:
         frappe.logger().info("Starting manual location data import...")
-        result = refresh_location_data(force_update=True)
+        result = refresh_location_data(force_update=True, full_snapshot=True)
         frappe.logger().info(f"Manual location data import completed: {result}")
         return result
     except Exception as e:
@@ -0,0 +1,6 @@
+from erpnext_location.erpnext_location.utils.indexes import add_indexes
+
+
+def execute():
+    """Add composite indexes on City and State and the code index on Country"""
+    add_indexes()
@@ -0,0 +1,7 @@
+from erpnext_location.erpnext_location.utils.geo import backfill_geohash
+
+
+def execute():
+    """Set the geohash of existing states and cities"""
+    for doctype in ("State", "City"):
+        backfill_geohash(doctype)
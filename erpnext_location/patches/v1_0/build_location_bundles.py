@@ -0,0 +1,6 @@
+from erpnext_location.erpnext_location.utils.bundles import build_bundles
+
+
+def execute():
+    """Write the client bundles of existing states and cities"""
+    build_bundles()
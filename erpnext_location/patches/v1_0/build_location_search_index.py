@@ -0,0 +1,7 @@
+from erpnext_location.erpnext_location.utils.search import rebuild_search_index
+
+
+def execute():
+    """Index existing states and cities for the City and State link search"""
+    for doctype in ("State", "City"):
+        rebuild_search_index(doctype)
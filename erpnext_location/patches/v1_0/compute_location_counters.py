@@ -0,0 +1,6 @@
+from erpnext_location.erpnext_location.utils.counters import recompute_counters
+
+
+def execute():
+    """Fill the state, city and address counters of existing locations"""
+    recompute_counters()
@@ -0,0 +1,12 @@
+import frappe
+
+from erpnext_location.erpnext_location.utils.consistency import reconcile_cities, reconcile_states
+from erpnext_location.erpnext_location.utils.lookup import clear_lookup_cache
+
+
+def execute():
+    """Copy region and subregion from Country to existing states, and from State to their cities"""
+    reconcile_states()
+    reconcile_cities()
+    frappe.db.commit()
+    clear_lookup_cache()
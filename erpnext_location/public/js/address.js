@@ -0,0 +1,57 @@
+// Copyright (c) 2025, Novizna and contributors
+// For license information, please see license.txt
+
+// Country > Linked State > Linked City on Address. The pickers search on the
+// server through the indexed link search, narrowed to the selected country and
+// state; checking that a pick still fits its parents and filling the free-text
+// State and City fields runs in the browser against the location bundles.
+
+frappe.ui.form.on("Address", {
+	setup(frm) {
+		frm.set_query("location_state", () => ({ filters: { country: frm.doc.country } }));
+		frm.set_query("location_city", () => ({
+			filters: { country: frm.doc.country, state: frm.doc.location_state },
+		}));
+	},
+
+	refresh(frm) {
+		// Start loading the bundle while the user is still reading the form
+		erpnext_location.locations.load(frm.doc.country);
+	},
+
+	country(frm) {
+		if (!frm.doc.location_state) {
+			return;
+		}
+		erpnext_location.locations.get_state(frm.doc.country, frm.doc.location_state).then((state) => {
+			if (!state) {
+				frm.set_value({ location_state: null, location_city: null });
+			}
+		});
+	},
+
+	location_state(frm) {
+		const { country, location_state, location_city } = frm.doc;
+		erpnext_location.locations.get_state(country, location_state).then((state) => {
+			if (state) {
+				frm.set_value("state", state.state_name);
+			}
+		});
+		if (location_city) {
+			erpnext_location.locations.get_city(country, location_state, location_city).then((city) => {
+				if (!city) {
+					frm.set_value("location_city", null);
+				}
+			});
+		}
+	},
+
+	location_city(frm) {
+		const { country, location_state, location_city } = frm.doc;
+		erpnext_location.locations.get_city(country, location_state, location_city).then((city) => {
+			if (city) {
+				frm.set_value("city", city.city_name);
+			}
+		});
+	},
+});
@@ -0,0 +1,109 @@
+// Copyright (c) 2025, Novizna and contributors
+// For license information, please see license.txt
+
+// States and cities of a country, read from the static bundles written after
+// each import (erpnext_location/erpnext_location/utils/bundles.py), so cascading
+// Country > State > City choices need no server round trip. Bundle files are
+// content-hashed and cached by the browser; only the manifest is revalidated.
+// Browsers without DecompressionStream, and countries missing from the
+// manifest, fall back to erpnext_location.api.
+
+frappe.provide("erpnext_location");
+
+const MANIFEST_URL = "/files/location_bundles/manifest.json";
+
+erpnext_location.locations = {
+	manifest: null,
+	bundles: {},
+
+	get_manifest() {
+		if (!this.manifest) {
+			this.manifest = fetch(MANIFEST_URL, { cache: "no-cache" })
+				.then((response) => (response.ok ? response.json() : { countries: {} }))
+				.catch(() => {
+					this.manifest = null;
+					return { countries: {} };
+				});
+		}
+		return this.manifest;
+	},
+
+	// {states, cities_by_state} of a country, or null when it has to come from the API
+	load(country) {
+		if (!country || !window.DecompressionStream) {
+			return Promise.resolve(null);
+		}
+		if (!(country in this.bundles)) {
+			this.bundles[country] = this.fetch_bundle(country).catch(() => {
+				delete this.bundles[country];
+				return null;
+			});
+		}
+		return this.bundles[country];
+	},
+
+	async fetch_bundle(country) {
+		const entry = (await this.get_manifest()).countries[country];
+		if (!entry) {
+			return null;
+		}
+
+		const response = await fetch(entry.url);
+		if (!response.ok) {
+			throw new Error(`${entry.url}: ${response.status}`);
+		}
+		const stream = response.body.pipeThrough(new DecompressionStream("gzip"));
+		const bundle = await new Response(stream).json();
+
+		const states = bundle.states.map(([name, state_name, state_code]) => ({
+			name,
+			state_name,
+			state_code,
+		}));
+		const cities_by_state = {};
+		for (const [name, city_name, state_index] of bundle.cities) {
+			const state = states[state_index].name;
+			(cities_by_state[state] = cities_by_state[state] || []).push({ name, city_name, state });
+		}
+		return { states, cities_by_state };
+	},
+
+	async get_states(country) {
+		const bundle = await this.load(country);
+		if (bundle) {
+			return bundle.states;
+		}
+		if (!country) {
+			return [];
+		}
+		const r = await frappe.call("erpnext_location.api.get_states", { country });
+		return r.message || [];
+	},
+
+	async get_cities(country, state) {
+		const bundle = await this.load(country);
+		if (bundle) {
+			return bundle.cities_by_state[state] || [];
+		}
+		if (!state) {
+			return [];
+		}
+
+		let cities = [];
+		for (let page = 0; ; page++) {
+			const r = await frappe.call("erpnext_location.api.get_cities", { state, page, page_length: 500 });
+			cities = cities.concat(r.message.cities.map((city) => ({ ...city, state })));
+			if (!r.message.has_more) {
+				return cities;
+			}
+		}
+	},
+
+	async get_state(country, state) {
+		return (await this.get_states(country)).find((row) => row.name === state);
+	},
+
+	async get_city(country, state, city) {
+		return (await this.get_cities(country, state)).find((row) => row.name === city);
+	},
+};
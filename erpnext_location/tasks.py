@@ -3,6 +3,7 @@
 
 import frappe
 from erpnext_location.erpnext_location.utils.data_import import refresh_location_data
+from erpnext_location.erpnext_location.utils.import_coordinator import enqueue_sharded_import
 
 
 def update_location_data():
@@ -13,19 +14,18 @@ def update_location_data():
         # Check if auto-update is enabled (you can add a settings doctype for this)
         # For now, we'll run the update as a background job to avoid blocking
 
-        # Queue the update as background job
-        frappe.enqueue(
-            method="erpnext_location.erpnext_location.utils.data_import.refresh_location_data_chunked",
-            queue="long",
-            timeout=3600,
+        # Queue the update as background job, sharded by country
+        run_id = enqueue_sharded_import(
             force_update=False,  # Don't force update existing records for scheduled runs
-            chunk_size=50,
-            job_name="scheduled_location_data_update"
+            incremental=True,  # Only rewrite records whose upstream data changed
+            bulk=True,
+            streaming=True,
+            full_snapshot=True,  # The whole upstream dataset, so rows missing from it are deactivated
         )
 
-        frappe.logger().info("Scheduled location data update queued successfully")
+        frappe.logger().info(f"Scheduled location data update {run_id} queued successfully")
 
-        return {"status": "queued", "message": "Location data update queued as background job"}
+        return {"status": "queued", "run_id": run_id, "message": "Location data update queued as background job"}
 
     except Exception as e:
         frappe.logger().error(f"Scheduled location data update failed: {str(e)}")